@@ -0,0 +1,111 @@
+"""End-to-end build benchmark on a synthetic corpus.
+
+    python bench/bench_build.py --pages 2000 --repeat 3 --output results.json
+
+Times a clean full build via main.main(), the copy_files and
+generate_pages_recursive phases on their own and a no-op rebuild, and
+writes the results as JSON, so runs of different versions can be compared.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from contextlib import redirect_stdout
+
+from corpus import ROOT, add_corpus_arguments, corpus_arguments, generate_corpus
+
+sys.path.insert(0, str(ROOT / "src"))
+from main import main, copy_files
+from markdown_to_html import generate_pages_recursive
+
+
+def timed(function, **kwargs):
+    """Runs function with its output silenced, returns the seconds it took."""
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        function(**kwargs)
+        return time.perf_counter() - start
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(repeat, jobs):
+    """Runs every benchmark repeat times in the current directory.
+
+    Returns
+    -------
+    dict
+        {benchmark name: [seconds, ...]}
+    """
+    names = ["full_build", "noop_rebuild", "copy_files", "generate_pages"]
+    results = {name: [] for name in names}
+    for _ in range(repeat):
+        results["full_build"].append(timed(main, clean=True, jobs=jobs))
+        results["noop_rebuild"].append(timed(main, jobs=jobs))
+        results["copy_files"].append(timed(copy_files))
+        results["generate_pages"].append(timed(generate_pages_recursive, jobs=jobs))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the site build")
+    add_corpus_arguments(parser)
+    parser.add_argument("--repeat", type=int, help="Runs per benchmark", default=3)
+    parser.add_argument("--jobs", type=int, help="Processes to render with", default=1)
+    parser.add_argument(
+        "--output", type=Path, help="JSON file to write results to", default=None
+    )
+    args = parser.parse_args()
+    corpus = corpus_arguments(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(Path(tmp), **corpus)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            results = run_benchmarks(args.repeat, args.jobs)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "version": git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "corpus": corpus,
+        "jobs": args.jobs,
+        "results": {
+            name: {
+                "min_s": min(times),
+                "median_s": sorted(times)[len(times) // 2],
+                "runs_s": times,
+            }
+            for name, times in results.items()
+        },
+    }
+
+    print(f"{args.pages} pages, {args.repeat} runs, {args.jobs} job(s)\n")
+    for name, result in report["results"].items():
+        per_page = result["min_s"] / args.pages * 1000
+        print(f"{name:<16}{result['min_s']:>10.3f} s{per_page:>10.3f} ms/page")
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to '{args.output}'")
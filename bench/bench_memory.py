@@ -0,0 +1,90 @@
+"""Memory per node of the parsed representation of a large page.
+
+    python bench/bench_memory.py --paragraphs 2000
+
+Parses one large synthetic page and compares the bytes allocated for its
+TextNodes and HTMLNode tree with the __slots__ classes against the same
+nodes as classes with a per-instance __dict__ (what they used to be).
+"""
+
+import sys
+import random
+import argparse
+import tracemalloc
+
+from corpus import ROOT, page
+
+sys.path.insert(0, str(ROOT / "src"))
+from block_markdown import markdown_to_html_node
+from htmlnode import LeafNode, ParentNode
+from inline_markdown import text_to_textnodes
+from textnode import TextNode
+
+
+# same classes with a per-instance __dict__, like before __slots__
+class DictTextNode(TextNode):
+    pass
+
+
+class DictLeafNode(LeafNode):
+    pass
+
+
+class DictParentNode(ParentNode):
+    pass
+
+
+def copy_text_nodes(nodes, text_cls):
+    return [text_cls(node.text, node.text_type, node.url) for node in nodes]
+
+
+def copy_tree(node, leaf_cls, parent_cls):
+    if isinstance(node, ParentNode):
+        children = [copy_tree(child, leaf_cls, parent_cls) for child in node.children]
+        return parent_cls(node.tag, children, node.props)
+    return leaf_cls(node.tag, node.value, node.props)
+
+
+def count_nodes(node):
+    if isinstance(node, ParentNode):
+        return 1 + sum(count_nodes(child) for child in node.children)
+    return 1
+
+
+def allocated(function, *args):
+    """Returns the result of function and the bytes it allocated."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark node memory")
+    parser.add_argument(
+        "--paragraphs", type=int, help="Paragraphs in the page", default=2000
+    )
+    parser.add_argument("--seed", type=int, help="Random seed", default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    urls = [f"page{i}.html" for i in range(100)]
+    lists = args.paragraphs // 10
+    markdown = page(rng, "Large page", args.paragraphs, lists, 10, 0.05, 0.01, urls)
+    tree = markdown_to_html_node(markdown)
+    text_nodes = text_to_textnodes(markdown.replace("\n\n", " "))
+    nodes = count_nodes(tree)
+
+    print(f"{len(markdown)} characters, {nodes} HTMLNodes, {len(text_nodes)} TextNodes")
+    print(f"\n{'representation':<24}{'HTMLNode B/node':>18}{'TextNode B/node':>18}")
+    for name, text_cls, leaf_cls, parent_cls in [
+        ("__dict__ (before)", DictTextNode, DictLeafNode, DictParentNode),
+        ("__slots__ (after)", TextNode, LeafNode, ParentNode),
+    ]:
+        # strings are shared with the original nodes, so only nodes are counted
+        _, tree_size = allocated(copy_tree, tree, leaf_cls, parent_cls)
+        _, text_size = allocated(copy_text_nodes, text_nodes, text_cls)
+        per_text_node = text_size / len(text_nodes)
+        print(f"{name:<24}{tree_size / nodes:>18.1f}{per_text_node:>18.1f}")
@@ -0,0 +1,66 @@
+"""Peak memory of rendering one very large page, read whole vs streamed.
+
+    python bench/bench_stream.py --paragraphs 50000
+
+Writes one large synthetic page and renders it with render_page() twice:
+once read into memory as a whole and once streamed block by block (what
+pages larger than STREAM_SIZE get). Prints the time and the peak memory
+traced by tracemalloc for both and checks that the outputs are the same.
+"""
+
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from corpus import ROOT, page
+
+sys.path.insert(0, str(ROOT / "src"))
+import markdown_to_html
+
+
+def peak(stream_size, src, tmplt, dst):
+    """Renders src with the given STREAM_SIZE, returns seconds and peak bytes."""
+    markdown_to_html.STREAM_SIZE = stream_size
+    tracemalloc.start()
+    start = time.perf_counter()
+    markdown_to_html.render_page(src, tmplt, dst)
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streamed rendering")
+    parser.add_argument(
+        "--paragraphs", type=int, help="Paragraphs in the page", default=50000
+    )
+    parser.add_argument("--seed", type=int, help="Random seed", default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    urls = [f"page{i}.html" for i in range(100)]
+    lists = args.paragraphs // 10
+    markdown = page(rng, "Large page", args.paragraphs, lists, 10, 0.03, 0.005, urls)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        src = tmp / "large.md"
+        src.write_text(markdown)
+        tmplt = ROOT / "template" / "template.html"
+        print(f"{src.stat().st_size / 2**20:.1f} MiB of markdown\n")
+        print(f"{'rendering':<12}{'seconds':>10}{'peak MiB':>12}")
+
+        outputs = []
+        for name, stream_size in [("read", float("inf")), ("streamed", 0)]:
+            dst = tmp / f"{name}.html"
+            seconds, size = peak(stream_size, src, tmplt, dst)
+            outputs.append(dst.read_bytes())
+            print(f"{name:<12}{seconds:>10.2f}{size / 2**20:>12.1f}")
+
+    if outputs[0] != outputs[1]:
+        sys.exit("streamed output differs")
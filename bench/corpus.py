@@ -0,0 +1,158 @@
+"""Generates synthetic markdown corpora for benchmarks.
+
+    python bench/corpus.py /tmp/site --pages 1000 --depth 3
+
+writes a project with content/, static/ and template/ to /tmp/site.
+"""
+
+import random
+import shutil
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "lord of mordor while elves dwarves and men received lesser rings "
+    "frodo baggins of the shire carried it east with samwise gamgee "
+    "through moria and lothlorien past the falls of rauros into emyn muil"
+).split()
+
+
+def sentence(rng, length, link_density, image_density, pages):
+    """Returns a sentence with inline markdown sprinkled in."""
+    words = []
+    for _ in range(length):
+        roll = rng.random()
+        word = rng.choice(WORDS)
+        if roll < image_density:
+            words.append(f"![{word}](/images/rivendell.png)")
+        elif roll < image_density + link_density:
+            words.append(f"[{word}](/{rng.choice(pages)})")
+        elif roll < image_density + link_density + 0.03:
+            words.append(f"**{word}**")
+        elif roll < image_density + link_density + 0.06:
+            words.append(f"*{word}*")
+        elif roll < image_density + link_density + 0.08:
+            words.append(f"`{word}`")
+        else:
+            words.append(word)
+    return " ".join(words).capitalize() + "."
+
+
+def page(
+    rng, title, paragraphs, lists, code_blocks, link_density, image_density, pages
+):
+    """Returns the markdown of one page."""
+    blocks = [f"# {title}"]
+    kinds = ["p"] * paragraphs + ["ul", "ol"] * lists + ["code"] * code_blocks
+    rng.shuffle(kinds)
+
+    for i, kind in enumerate(kinds):
+        if i % 4 == 0:
+            blocks.append(f"## {sentence(rng, 4, 0, 0, pages)[:-1]}")
+        if kind == "p":
+            lines = [
+                sentence(rng, rng.randint(8, 30), link_density, image_density, pages)
+                for _ in range(rng.randint(1, 4))
+            ]
+            blocks.append("\n".join(lines))
+        elif kind == "ul":
+            items = rng.randint(2, 8)
+            blocks.append("\n".join(
+                f"- {sentence(rng, 6, link_density, 0, pages)}" for _ in range(items)
+            ))
+        elif kind == "ol":
+            items = rng.randint(2, 8)
+            blocks.append("\n".join(
+                f"{n}. {sentence(rng, 6, link_density, 0, pages)}"
+                for n in range(1, items + 1)
+            ))
+        else:
+            lines = [f'print("{rng.choice(WORDS)}")' for _ in range(rng.randint(2, 10))]
+            blocks.append("```\n" + "\n".join(lines) + "\n```")
+
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(
+    root: Path,
+    pages: int = 100,
+    depth: int = 2,
+    paragraphs: int = 10,
+    lists: int = 2,
+    code_blocks: int = 1,
+    link_density: float = 0.03,
+    image_density: float = 0.005,
+    seed: int = 0,
+):
+    """Writes a project with a synthetic content/ tree into root.
+
+    static/ and template/ are copied from this repository. Same
+    arguments always give the same corpus.
+    """
+    rng = random.Random(seed)
+    shutil.rmtree(root / "content", ignore_errors=True)
+    shutil.copytree(ROOT / "static", root / "static", dirs_exist_ok=True)
+    shutil.copytree(ROOT / "template", root / "template", dirs_exist_ok=True)
+
+    # spread pages over nested sections, e.g. s1/s4/page17
+    paths = []
+    for i in range(pages):
+        sections = [f"s{rng.randint(0, 9)}" for _ in range(rng.randint(0, depth))]
+        paths.append("/".join(sections + [f"page{i}"]))
+    urls = [f"{path}.html" for path in paths]
+
+    for i, path in enumerate(paths):
+        src = root / "content" / f"{path}.md"
+        src.parent.mkdir(parents=True, exist_ok=True)
+        title = f"Page {i}: {sentence(rng, 3, 0, 0, urls)[:-1]}"
+        src.write_text(
+            page(
+                rng, title, paragraphs, lists, code_blocks,
+                link_density, image_density, urls,
+            )
+        )
+    (root / "content" / "index.md").write_text(
+        "# Home\n\n" + "\n".join(f"- [{url}](/{url})" for url in urls[:100]) + "\n"
+    )
+
+
+def add_corpus_arguments(parser):
+    """Adds the arguments of generate_corpus to an ArgumentParser."""
+    arguments = [
+        ("--pages", int, "Number of pages", 100),
+        ("--depth", int, "Max directory depth", 2),
+        ("--paragraphs", int, "Paragraphs per page", 10),
+        ("--lists", int, "Lists of each kind per page", 2),
+        ("--code-blocks", int, "Code blocks per page", 1),
+        ("--link-density", float, "Links per word", 0.03),
+        ("--image-density", float, "Images per word", 0.005),
+        ("--seed", int, "Random seed", 0),
+    ]
+    for name, type_, help_, default in arguments:
+        parser.add_argument(name, type=type_, help=help_, default=default)
+
+
+def corpus_arguments(args) -> dict:
+    """Returns the generate_corpus keyword arguments from parsed args."""
+    return {
+        "pages": args.pages,
+        "depth": args.depth,
+        "paragraphs": args.paragraphs,
+        "lists": args.lists,
+        "code_blocks": args.code_blocks,
+        "link_density": args.link_density,
+        "image_density": args.image_density,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus")
+    parser.add_argument("root", type=Path, help="Project directory to write into")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    generate_corpus(args.root, **corpus_arguments(args))
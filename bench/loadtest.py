@@ -0,0 +1,200 @@
+"""Small load test for server.py against localhost.
+
+Compares the stock single-threaded http.server with server.py's threaded
+StaticHandler, which answers revalidation requests with 304:
+
+    python bench/loadtest.py --dir public --clients 16 --duration 5
+
+Every server is run twice, the second time with --slow-clients more
+clients that trickle their requests and read the responses slowly.
+Latencies are those of the other clients only. With more clients than
+the listen backlog of the server (5 for http.server), the max latency
+includes connections that were retried after a second or more.
+
+Run `python src/main.py` first, so there is a site in public/.
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import http.client
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from server import StaticHandler, ThreadingHTTPServer
+
+
+def site_paths(directory):
+    """Returns the URL paths of all files in a built site."""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.endswith((".gz", ".br")):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), directory)
+            paths.append("/" + rel.replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def client(port, paths, deadline, revalidate, latencies, statuses):
+    """Requests paths in a loop until deadline, like a browser reloading."""
+    conn = http.client.HTTPConnection("localhost", port)
+    etags = {}
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {"Accept-Encoding": "gzip"}
+        if revalidate and path in etags:
+            headers["If-None-Match"] = etags[path]
+
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (ConnectionError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("localhost", port)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status)
+
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+        # HTTP/1.0 servers close the connection after every response
+        if response.getheader("Connection", "").lower() != "keep-alive":
+            conn.close()
+            conn = http.client.HTTPConnection("localhost", port)
+    conn.close()
+
+
+def slow_client(port, paths, deadline, delay=0.05):
+    """Sends requests one byte at a time and reads the responses one byte
+    at a time, with delay seconds in between, until deadline."""
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        request = f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode()
+        with socket.create_connection(("localhost", port)) as sock:
+            sock.settimeout(1)
+            try:
+                for byte in request:
+                    if time.perf_counter() >= deadline:
+                        return
+                    sock.sendall(bytes([byte]))
+                    time.sleep(delay)
+                while time.perf_counter() < deadline and sock.recv(1):
+                    time.sleep(delay)
+            except (ConnectionError, TimeoutError):
+                continue
+
+
+def load_test(
+    server_class,
+    handler_class,
+    directory,
+    paths,
+    clients,
+    duration,
+    revalidate,
+    slow_clients=0,
+):
+    """Serves directory and runs clients and slow_clients against it for
+    duration seconds. Only the clients are measured."""
+    quiet_handler = type(
+        "QuietHandler", (handler_class,), {"log_message": lambda *args: None}
+    )
+    # slow clients hang up in the middle of responses at the deadline
+    quiet_server = type(
+        "QuietServer", (server_class,), {"handle_error": lambda *args: None}
+    )
+    httpd = quiet_server(("localhost", 0), partial(quiet_handler, directory=directory))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    latencies = []
+    statuses = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(httpd.server_port, paths, deadline, revalidate, latencies, statuses),
+        )
+        for _ in range(clients)
+    ]
+    threads += [
+        threading.Thread(
+            target=slow_client, args=(httpd.server_port, paths, deadline)
+        )
+        for _ in range(slow_clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    httpd.shutdown()
+    httpd.server_close()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_s": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0,
+        "not_modified": statuses.count(304),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test server.py")
+    parser.add_argument("--dir", type=str, help="Built site to serve", default="public")
+    parser.add_argument("--clients", type=int, help="Concurrent clients", default=16)
+    parser.add_argument("--duration", type=float, help="Seconds per run", default=5)
+    parser.add_argument(
+        "--slow-clients",
+        type=int,
+        help="Clients that trickle requests, in the second run of every server",
+        default=1,
+    )
+    args = parser.parse_args()
+
+    paths = site_paths(args.dir)
+    if not paths:
+        sys.exit(f"No files in '{args.dir}', build the site first")
+
+    runs = [
+        ("stock http.server", HTTPServer, SimpleHTTPRequestHandler, False),
+        ("server.py", ThreadingHTTPServer, StaticHandler, True),
+    ]
+    print(f"{len(paths)} paths, {args.clients} clients, {args.duration}s per run\n")
+    print(
+        f"{'server':<20}{'slow':>6}{'requests/s':>12}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'max ms':>10}{'304s':>10}"
+    )
+    for name, server_class, handler_class, revalidate in runs:
+        for slow_clients in (0, args.slow_clients):
+            result = load_test(
+                server_class,
+                handler_class,
+                args.dir,
+                paths,
+                args.clients,
+                args.duration,
+                revalidate,
+                slow_clients,
+            )
+            print(
+                f"{name:<20}{slow_clients:>6}{result['requests_per_s']:>12.0f}"
+                f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['max_ms']:>10.2f}{result['not_modified']:>10}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,355 @@
+import io
 import os
+import sys
 import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import hashlib
+import threading
+from fnmatch import fnmatch
+from functools import partial
+from pathlib import Path
+from urllib.parse import unquote, urlsplit, urlunsplit
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+)
+
+
+# precompressed variants written by the build, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml"}
+# content hashed names written by main.py --fingerprint, e.g. index.3f2a1b9c.css
+FINGERPRINTED = "*." + "[0-9a-f]" * 8 + ".*"
+
+
+def accepted_encodings(header):
+    """Parses an Accept-Encoding header into the set of accepted encodings."""
+    accepted = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_matches(header, etag):
+    """Checks an If-None-Match header against an ETag."""
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    """Serves a built site with caching support.
+
+    * Precompressed .br/.gz siblings are served when the client accepts
+      them, so nothing is compressed per request.
+    * Strong ETags from content hashes answer If-None-Match with 304.
+    * Cache-Control is set by the first matching cache_control pattern.
+    """
+
+    # list of tuples, first match wins: [(url path pattern, Cache-Control), ...]
+    cache_control = [
+        ("*.html", "no-cache"),
+        (FINGERPRINTED, "public, max-age=31536000, immutable"),
+        ("*", "public, max-age=3600"),
+    ]
+    # {file path: (mtime_ns, size, etag)}
+    etags = {}
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        url_path = unquote(self.path.split("?", 1)[0].split("#", 1)[0])
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not url_path.endswith("/") or not os.path.isfile(index):
+                # redirect or directory listing
+                return super().send_head()
+            path = index
+            url_path += "index.html"
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        self.vary = os.path.splitext(path)[1] in COMPRESSIBLE
+        encoding = self.pick_encoding(path) if self.vary else None
+        file_path = path + ENCODINGS[encoding] if encoding else path
+        f = open(file_path, "rb")
+        stat = os.fstat(f.fileno())
+        etag = self.etag(file_path, stat)
+
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            f.close()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_cache_control(url_path)
+            self.end_headers()
+            return None
+
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+        self.send_header("ETag", etag)
+        self.send_cache_control(url_path)
+        self.end_headers()
+        return f
+
+    def etag(self, path, stat):
+        """Returns a strong ETag from the content hash, cached by mtime and size."""
+        cached = self.etags.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        self.etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+    def send_cache_control(self, url_path):
+        for pattern, value in self.cache_control:
+            if fnmatch(url_path, pattern):
+                self.send_header("Cache-Control", value)
+                return
+
+    def pick_encoding(self, path):
+        """Returns the preferred accepted encoding with an up to date variant."""
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+        mtime = os.stat(path).st_mtime_ns
+        for encoding, suffix in ENCODINGS.items():
+            if encoding not in accepted and "*" not in accepted:
+                continue
+            try:
+                # older variants belong to a previous build
+                if os.stat(path + suffix).st_mtime_ns >= mtime:
+                    return encoding
+            except FileNotFoundError:
+                continue
+        return None
+
+    def end_headers(self):
+        if getattr(self, "vary", False):
+            self.send_header("Vary", "Accept-Encoding")
+        super().end_headers()
+
+
+class ReloadNotifier:
+    """Lets handler threads wait for the next rebuild."""
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=15):
+        """Waits until a rebuild newer than version happened, returns the latest version."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+
+class LiveReloadHandler(StaticHandler):
+    """Serves files, injects a reload script into HTML pages and
+    pushes reload events over Server-Sent Events on RELOAD_PATH."""
+
+    notifier = ReloadNotifier()
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_events()
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+
+        with open(path, "rb") as f:
+            html = f.read()
+        html = html.replace(b"</body>", RELOAD_SCRIPT.encode() + b"</body>", 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(html)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        version = self.notifier.version
+        try:
+            while True:
+                latest = self.notifier.wait(version)
+                if latest > version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = latest
+                else:
+                    # keep-alive, also detects closed connections
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class OnDemandHandler(SimpleHTTPRequestHandler):
+    """Renders pages from content/ when they are requested and serves
+    everything else from the handler's directory, e.g. static/.
+
+    Pages use the template named in their front matter, like in a
+    build, drafts are not served. Rendered pages are cached in memory
+    until their source or one of the files of their template changes.
+    """
+
+    content = "content"
+    template = os.path.join("template", "template.html")
+    # {source path: (source mtime, {template file: mtime}, html or None)}
+    cache = {}
+
+    def send_head(self):
+        # used by do_GET and do_HEAD, returns the body to send or None
+        source = self.source_path()
+        if source is None:
+            if not self.is_page_directory():
+                return super().send_head()
+            # /majesty -> /majesty/, so relative links resolve like in a build
+            parts = urlsplit(self.path)
+            location = urlunsplit(parts._replace(path=parts.path + "/"))
+            self.send_response(301)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        if not os.path.isfile(source):
+            return super().send_head()
+
+        try:
+            html = self.render(source)
+        except Exception as e:
+            self.send_error(500, f"Could not render '{source}'", f"{e}")
+            return None
+        if html is None:
+            self.send_error(404, "File not found")
+            return None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.end_headers()
+        return io.BytesIO(html)
+
+    def request_parts(self):
+        """Returns the request path and its parts, without empty ones and ".."."""
+        path = unquote(self.path.split("?", 1)[0].split("#", 1)[0])
+        return path, [part for part in path.split("/") if part and part != ".."]
+
+    def source_path(self):
+        """Maps a request path like /majesty/index.html to its markdown source."""
+        path, parts = self.request_parts()
+        if path.endswith("/"):
+            parts.append("index.html")
+        if not parts or not parts[-1].endswith(".html"):
+            return None
+        return os.path.join(self.content, *parts)[: -len(".html")] + ".md"
+
+    def is_page_directory(self):
+        """Checks if a request path without a trailing slash like /majesty
+        is a directory of content/ with an index.md."""
+        path, parts = self.request_parts()
+        if path.endswith("/") or not parts:
+            return False
+        return os.path.isfile(os.path.join(self.content, *parts, "index.md"))
+
+    def render(self, source):
+        """Returns the rendered page of source or None if it is a draft."""
+        from markdown_to_html import page_template, write_page
+        from metadata import read_header
+        from templates import load_template
+
+        source_mtime = os.stat(source).st_mtime_ns
+        cached = self.cache.get(source)
+        if cached is not None and cached[0] == source_mtime:
+            try:
+                mtimes = {path: os.stat(path).st_mtime_ns for path in cached[1]}
+            except OSError:
+                mtimes = None
+            if mtimes == cached[1]:
+                return cached[2]
+
+        metadata = read_header(Path(source))
+        if metadata["draft"]:
+            self.cache[source] = (source_mtime, {}, None)
+            return None
+        template = page_template(metadata, Path(self.template))
+        files = load_template(template).files
+        mtimes = {str(path): path.stat().st_mtime_ns for path in files}
+        buffer = io.StringIO()
+        write_page(buffer, Path(source), template, metadata)
+        html = buffer.getvalue().encode()
+        self.cache[source] = (source_mtime, mtimes, html)
+        return html
+
+
+def add_src_to_path():
+    """Makes the generator in src/ importable."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+
+def watch_and_rebuild(notifier):
+    """Builds the site once, then rebuilds on changes in a background thread."""
+    add_src_to_path()
+    from main import main
+    from watch import watch
+
+    main()
+    thread = threading.Thread(target=watch, args=(notifier.notify,), daemon=True)
+    thread.start()
+    print("\n👀 Watching 'content/', 'static/' and 'template/' for changes")
 
 
 def run(
-    server_class=HTTPServer,
-    handler_class=SimpleHTTPRequestHandler,
+    server_class=ThreadingHTTPServer,
+    handler_class=StaticHandler,
     port=8888,
     directory=None,
+    watch=False,
+    on_demand=False,
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
+    if on_demand:
+        # nothing is built upfront, static files come straight from static/
+        add_src_to_path()
+        handler_class = OnDemandHandler
+        directory = "static"
+    elif watch:
+        handler_class = LiveReloadHandler
+        watch_and_rebuild(LiveReloadHandler.notifier)
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
+    httpd = server_class(server_address, partial(handler_class, directory=directory))
     print(f"\nStarting web server")
     print("==================================")
     print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
@@ -25,6 +362,32 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild on changes and reload open browsers (run from the project root)",
+    )
+    parser.add_argument(
+        "--on-demand",
+        action="store_true",
+        help="Render pages when requested instead of serving a build (run from the project root)",
+    )
+    parser.add_argument(
+        "--cache-control",
+        action="append",
+        default=[],
+        metavar="PATTERN=VALUE",
+        help='Cache-Control for matching paths, e.g. "*.css=public, max-age=86400"',
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
\ No newline at end of file
+    # rules from the command line go before the defaults
+    rules = [tuple(rule.split("=", 1)) for rule in args.cache_control]
+    StaticHandler.cache_control = rules + StaticHandler.cache_control
+
+    run(
+        port=args.port,
+        directory=args.dir,
+        watch=args.watch,
+        on_demand=args.on_demand,
+    )
@@ -18,6 +18,34 @@ class BlockType(Enum):
     ORDERED_LIST = 6
 
 
+# list item markers, same as in block_to_block_type
+_UL_MARKER = re.compile(r"^[*-]\s")
+_OL_MARKER = re.compile(r"^.*?\s")
+
+
+def split_blocks(lines):
+    """Groups lines into blocks, separated by blank lines.
+
+    Yields
+    ------
+        list of the lines of each block
+    """
+    block = []
+
+    for line in lines:
+        if line != "" and line != "\r":
+            block.append(line)
+        elif block:
+            # "\r\n\r\n" separates blocks just like "\n\n"
+            if block[-1].endswith("\r"):
+                block[-1] = block[-1][:-1]
+            yield block
+            block = []
+
+    if block:
+        yield block
+
+
 def markdown_to_blocks(markdown):
     """Splits into a list of blocks.
 
@@ -28,139 +56,262 @@ def markdown_to_blocks(markdown):
     -------
         list
     """
-    pattern = r"(?:\r?\n){2,}"
-    return re.split(pattern, markdown.strip())
+    blocks = ["\n".join(lines) for lines in split_blocks(markdown.strip().split("\n"))]
+    return blocks or [""]
 
 
-def block_to_block_type(markdown_block):
-    """Returns the BlockType of a given markdown block.
+def _is_list_item(line, marker):
+    """Checks if line starts with the marker ("*" or "-") and a whitespace."""
+    return line[:1] == marker and line[1:2].isspace()
+
+
+def lines_to_block_type(lines):
+    """Returns the BlockType of a block given as a list of lines.
+
+    Checks all line based rules in a single pass over the lines.
 
     Returns
     -------
         BlockType
     """
-    lines = markdown_block.split("\n")
+    first = lines[0]
 
     # Headings
-    headings_pattern = r"^#{1,6}\s"
-    match = 1 if re.match(headings_pattern, lines[0]) else 0
-
-    if match and len(lines) == 1:
-        return BlockType.HEADING
-    elif match and len(lines) > 1:
+    level = len(first) - len(first.lstrip("#"))
+    if 1 <= level <= 6 and first[level : level + 1].isspace():
+        if len(lines) == 1:
+            return BlockType.HEADING
         raise Exception("Heading contains a line break.")
         # ToDo: Deal with more than 6 #
 
     # Code Blocks
-    if lines[0][:3] == "```" and lines[-1][-3:] == "```":
-        return BlockType.CODE
-    if lines[0][:3] == "```" and lines[-1][-3:] != "```":
+    if first[:3] == "```":
+        if lines[-1][-3:] == "```":
+            return BlockType.CODE
         raise Exception(f"Code Block not closed: {lines[-1]}.")
 
-    # Quotes
-    quotes_pattern = r"^>"
-    matches = sum(1 for line in lines if re.match(quotes_pattern, line))
+    quotes = stars = dashes = 0
+    ordered = first.startswith("1. ")
+    for number, line in enumerate(lines, 1):
+        quotes += line[:1] == ">"
+        stars += _is_list_item(line, "*")
+        dashes += _is_list_item(line, "-")
+        if ordered and not line.startswith(f"{number}. "):
+            ordered = None
 
-    if matches == len(lines):
+    # Quotes
+    if quotes == len(lines):
         return BlockType.QUOTE
-    elif matches and matches != len(lines):
+    elif quotes:
         raise Exception("Quotes Block Syntax not correct.")
 
     # Unordered List
-    ul_pattern_star = r"^\*\s"
-    ul_pattern_dash = r"^\-\s"
-    matches_star = sum(1 for line in lines if re.match(ul_pattern_star, line))
-    matches_dash = sum(1 for line in lines if re.match(ul_pattern_dash, line))
-
-    if matches_star == len(lines) or matches_dash == len(lines):
+    if stars == len(lines) or dashes == len(lines):
         return BlockType.UNORDERED_LIST
-
-    elif matches_star and matches_star != len(lines):
-        raise Exception("Incorrect unordered list syntax.")
-    elif matches_dash and matches_dash != len(lines):
+    elif stars or dashes:
         raise Exception("Incorrect unordered list syntax.")
 
     # Ordered List
-    if lines[0].startswith("1. "):
-        item_count = 1
-        for line in lines:
-            if not line.startswith(f"{item_count}. "):
-                raise Exception("Incorrect ordered list syntax.")
-            else:
-                item_count += 1
+    if ordered is None:
+        raise Exception("Incorrect ordered list syntax.")
+    elif ordered:
         return BlockType.ORDERED_LIST
 
     return BlockType.PARAGRAPH
 
 
+def block_to_block_type(markdown_block):
+    """Returns the BlockType of a given markdown block.
+
+    Returns
+    -------
+        BlockType
+    """
+    return lines_to_block_type(markdown_block.split("\n"))
+
+
+def iter_blocks(markdown):
+    """Scans markdown line by line into blocks and their types.
+
+    Yields
+    ------
+        tuples: (BlockType, list of lines)
+    """
+    for lines in split_blocks(markdown.strip().split("\n")):
+        yield lines_to_block_type(lines), lines
+
+
+def strip_lines(lines):
+    """Strips lines read from a file like markdown.strip().split("\n").
+
+    Whitespace-only lines are held back until more text follows, so
+    they are dropped at the end without knowing where the end is.
+
+    Yields
+    ------
+        lines without their newline
+    """
+    last = None
+    blank = []
+
+    for line in lines:
+        line = line.removesuffix("\n")
+        if not line.strip():
+            if last is not None:
+                blank.append(line)
+            continue
+        if last is None:
+            line = line.lstrip()
+        else:
+            yield last
+            yield from blank
+            blank = []
+        last = line
+
+    if last is not None:
+        yield last.rstrip()
+
+
+def iter_file_blocks(lines):
+    """Like iter_blocks, for markdown given as lines, e.g. an open file.
+
+    Only the current block is held in memory.
+
+    Yields
+    ------
+        tuples: (BlockType, list of lines)
+    """
+    for block in split_blocks(strip_lines(lines)):
+        yield lines_to_block_type(block), block
+
+
+def heading_lines_to_html_node(lines):
+    heading_level = f"h{lines[0].count('#')}"
+    heading_text = lines[0].lstrip("# ")
+    return ParentNode(heading_level, text_to_html_nodes(heading_text))
+
+
+def codeblock_lines_to_html_node(lines):
+    code_text = "\n".join(lines)[3:-3]
+    return ParentNode("pre", [ParentNode("code", text_to_html_nodes(code_text))])
+
+
+def quote_lines_to_html_node(lines):
+    quote_text = "\n".join(line.lstrip(">") for line in lines)
+    return ParentNode("blockquote", text_to_html_nodes(quote_text))
+
+
+def unordered_list_lines_to_html_node(lines):
+    list_items = []
+    for line in lines:
+        list_item_text = _UL_MARKER.sub("", line, count=1)
+        list_items.append(ParentNode("li", text_to_html_nodes(list_item_text)))
+    return ParentNode("ul", list_items)
+
+
+def ordered_list_lines_to_html_node(lines):
+    list_items = []
+    for line in lines:
+        list_item_text = _OL_MARKER.sub("", line, count=1)
+        list_items.append(ParentNode("li", text_to_html_nodes(list_item_text)))
+    return ParentNode("ol", list_items)
+
+
+def paragraph_lines_to_html_node(lines):
+    return ParentNode("p", text_to_html_nodes("\n".join(lines)))
+
+
 def heading_to_html_node(heading_block):
     """Converts a Markdown Heading Block into HTMLNodes."""
-    heading_level = f"h{heading_block.count('#')}"
-    heading_text = heading_block.lstrip("# ")
-    return ParentNode(heading_level, text_to_html_nodes(heading_text))
+    return heading_lines_to_html_node(heading_block.split("\n"))
 
 
 def codeblock_to_html_node(code_block):
     """Converts a Markdown Code Block into HTMLNodes."""
-    code_text = code_block[3:-3]
-    return ParentNode("pre", [ParentNode("code", text_to_html_nodes(code_text))])
+    return codeblock_lines_to_html_node(code_block.split("\n"))
 
 
 def quote_to_html_node(quote_block):
     """Converts a Markdown Quote Block into HTMLNodes."""
-    quote_text = "\n".join(line.lstrip(">") for line in quote_block.split("\n"))
-    return ParentNode("blockquote", text_to_html_nodes(quote_text))
+    return quote_lines_to_html_node(quote_block.split("\n"))
 
 
 def unordered_list_to_html_node(ul_block):
     """Converts a Markdown Unordered List Block into HTMLNodes."""
-    list_item_texts = [re.sub(r"^[*-]\s", "", line) for line in ul_block.split("\n")]
-    list_items = []
-
-    for list_item_text in list_item_texts:
-        list_items.append(ParentNode("li", text_to_html_nodes(list_item_text)))
-
-    return ParentNode("ul", list_items)
+    return unordered_list_lines_to_html_node(ul_block.split("\n"))
 
 
 def ordered_list_to_html_node(ol_block):
     """Converts a Markdown Ordered List Block into HTMLNodes."""
-    list_item_texts = [re.sub(r"^.*?\s", "", line) for line in ol_block.split("\n")]
-    list_items = []
-
-    for list_item_text in list_item_texts:
-        list_items.append(ParentNode("li", text_to_html_nodes(list_item_text)))
-
-    return ParentNode("ol", list_items)
+    return ordered_list_lines_to_html_node(ol_block.split("\n"))
 
 
 def paragraph_to_html_node(paragraph_block):
     """Converts a Markdown Paragraph into HTMLNodes."""
-    return ParentNode("p", text_to_html_nodes(paragraph_block))
-
-
-def markdown_to_html_node(markdown):
-    """Converts Markdown to HTMLNodes."""
-    blocks = markdown_to_blocks(markdown)
+    return paragraph_lines_to_html_node(paragraph_block.split("\n"))
+
+
+def block_lines_to_html_node(block_type, lines):
+    """Converts the lines of a block of a given BlockType into HTMLNodes."""
+    match block_type:
+        case BlockType.HEADING:
+            return heading_lines_to_html_node(lines)
+        case BlockType.CODE:
+            return codeblock_lines_to_html_node(lines)
+        case BlockType.QUOTE:
+            return quote_lines_to_html_node(lines)
+        case BlockType.UNORDERED_LIST:
+            return unordered_list_lines_to_html_node(lines)
+        case BlockType.ORDERED_LIST:
+            return ordered_list_lines_to_html_node(lines)
+        case BlockType.PARAGRAPH:
+            return paragraph_lines_to_html_node(lines)
+        case _:
+            raise Exception("Unknown BlockType")
+
+
+def _cached_block_node(block_type, lines, block_cache):
+    html = block_cache.get(lines)
+    if html is not None:
+        return LeafNode(None, html)
+    node = block_lines_to_html_node(block_type, lines)
+    block_cache.put(lines, node.to_html())
+    return node
+
+
+def markdown_to_html_node(markdown, block_cache=None):
+    """Converts Markdown to HTMLNodes.
+
+    With a block_cache (anything with get(lines) and put(lines, html)),
+    blocks that were converted before are reused as raw HTML.
+    """
     block_nodes = []
 
-    for block in blocks:
-        block_type = block_to_block_type(block)
-
-        match block_type:
-            case BlockType.HEADING:
-                block_nodes.append(heading_to_html_node(block))
-            case BlockType.CODE:
-                block_nodes.append(codeblock_to_html_node(block))
-            case BlockType.QUOTE:
-                block_nodes.append(quote_to_html_node(block))
-            case BlockType.UNORDERED_LIST:
-                block_nodes.append(unordered_list_to_html_node(block))
-            case BlockType.ORDERED_LIST:
-                block_nodes.append(ordered_list_to_html_node(block))
-            case BlockType.PARAGRAPH:
-                block_nodes.append(paragraph_to_html_node(block))
-            case _:
-                raise Exception("Unknown BlockType")
+    for block_type, lines in iter_blocks(markdown):
+        if block_cache is None:
+            block_nodes.append(block_lines_to_html_node(block_type, lines))
+        else:
+            block_nodes.append(_cached_block_node(block_type, lines, block_cache))
+
+    if not block_nodes:
+        # empty markdown is a single empty paragraph
+        block_nodes.append(paragraph_to_html_node(""))
 
     return ParentNode("div", block_nodes)
+
+
+def write_markdown_html(stream, lines):
+    """Converts Markdown given as lines to HTML and writes it to a stream.
+
+    Writes the same HTML as markdown_to_html_node(...).to_html(), but
+    converts and writes one block at a time, so memory use depends on
+    the largest block and not on the size of the document.
+    """
+    stream.write("<div>")
+    empty = True
+    for block_type, block in iter_file_blocks(lines):
+        block_lines_to_html_node(block_type, block).write_html(stream)
+        empty = False
+    if empty:
+        paragraph_to_html_node("").write_html(stream)
+    stream.write("</div>")
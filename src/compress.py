@@ -0,0 +1,71 @@
+import gzip
+import os
+from pathlib import Path
+
+from manifest import BuildManifest
+
+try:
+    import brotli
+except ImportError:
+    # optional dependency, only .gz files are written without it
+    brotli = None
+
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml"}
+# smaller files don't get noticeably smaller
+MIN_SIZE = 1024
+
+
+def compressors() -> dict:
+    """Returns {suffix: compress function} of the available encodings."""
+    available = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        available[".br"] = lambda data: brotli.compress(data, quality=11)
+    return available
+
+
+def compress_outputs(manifest: BuildManifest, min_size: int = MIN_SIZE):
+    """Writes precompressed .gz (and .br) siblings of pages and static files.
+
+    Only compressible files of at least min_size bytes are compressed.
+    Siblings of unchanged files are reused, siblings of removed files
+    are deleted. Siblings get the mtime of their file, since a server
+    only sends siblings that are not older than the file.
+    """
+    print("\n\nCompressing outputs")
+    print("==================================")
+
+    for dst_file, src_file in manifest.stale("compressed"):
+        dst_file.unlink(missing_ok=True)
+        manifest.forget(dst_file)
+
+    count = reused = size = compressed_size = 0
+    for output, entry in list(manifest.outputs.items()):
+        src_file = Path(output)
+        if entry["kind"] not in ("page", "asset", "fingerprinted", "listing"):
+            continue
+        if src_file.suffix not in COMPRESSIBLE:
+            continue
+
+        for suffix, compress in compressors().items():
+            dst_file = src_file.with_name(src_file.name + suffix)
+            if not src_file.is_file() or src_file.stat().st_size < min_size:
+                # too small (now) -> drop an old sibling
+                dst_file.unlink(missing_ok=True)
+                manifest.forget(dst_file)
+                continue
+
+            if manifest.is_fresh(dst_file, [src_file]):
+                reused += 1
+            else:
+                dst_file.unlink(missing_ok=True)
+                dst_file.write_bytes(compress(src_file.read_bytes()))
+                manifest.record(dst_file, [src_file], kind="compressed")
+                count += 1
+                size += src_file.stat().st_size
+                compressed_size += dst_file.stat().st_size
+            # the file may have been written again with the same content
+            stat = src_file.stat()
+            os.utime(dst_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    print(f"🗜️ {count} file(s) compressed ({size} -> {compressed_size} bytes)")
+    print(f"⏩ {reused} file(s) unchanged")
@@ -0,0 +1,165 @@
+import json
+import posixpath
+import re
+import shutil
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+from manifest import BuildManifest
+
+# references that are rewritten: <a href>, <img src> and <link href>
+_REFERENCE = re.compile(r'(<(?:a|img|link)\s[^>]*?\b(?:href|src)=")([^"]*)"')
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """Returns name with a short content hash, e.g. index.3f2a1b9c.css."""
+    stem, dot, suffix = name.rpartition(".")
+    if not stem:
+        return f"{name}.{digest[:8]}"
+    return f"{stem}.{digest[:8]}{dot}{suffix}"
+
+
+class AssetMap:
+    """Maps URLs of static files to the URLs of their fingerprinted copies.
+
+    root is the output directory the URLs are relative to and path the
+    JSON file the map was written to.
+    """
+
+    def __init__(
+        self,
+        urls: dict,
+        root: Path = Path("public/"),
+        path: Path = Path("public/assets.json"),
+    ) -> None:
+        self.urls = urls
+        self.root = root
+        self.path = path
+
+    def rewrite(self, html: str, base: str = "/") -> str:
+        """Rewrites references to static files in html to fingerprinted URLs.
+
+        Relative references are resolved against base, the URL of the
+        directory of the page, and stay relative.
+        """
+
+        def replace(match):
+            parts = urlsplit(match[2])
+            if parts.scheme or parts.netloc or not parts.path:
+                return match[0]
+            url = posixpath.normpath(posixpath.join(base, parts.path))
+            fingerprinted = self.urls.get(url)
+            if fingerprinted is None:
+                return match[0]
+            # only the file name changes, so the reference keeps its form
+            path = posixpath.join(
+                posixpath.dirname(parts.path), posixpath.basename(fingerprinted)
+            )
+            return f'{match[1]}{urlunsplit(parts._replace(path=path))}"'
+
+        return _REFERENCE.sub(replace, html)
+
+    def writer(self, stream, dst: Path):
+        """Wraps a stream a page at dst is written to, rewriting every write."""
+        base = "/" + dst.parent.relative_to(self.root).as_posix() + "/"
+        return _RewritingWriter(stream, self, base.replace("/./", "/"))
+
+
+class _RewritingWriter:
+    # nodes and templates write whole tags at once, so no tag is split
+    # across two writes
+
+    def __init__(self, stream, assets: AssetMap, base: str) -> None:
+        self.stream = stream
+        self.assets = assets
+        self.base = base
+
+    def write(self, text: str):
+        return self.stream.write(self.assets.rewrite(text, self.base))
+
+
+def fingerprint_assets(
+    manifest: BuildManifest,
+    dst: Path = Path("public/"),
+    path: Path = Path("public/assets.json"),
+) -> AssetMap:
+    """Adds a copy with a content hash in its name next to every static file.
+
+    Copies are hardlinks of the static files in dst, unchanged files keep
+    their copy and copies of changed or removed files are deleted. The
+    {url: fingerprinted url} map is written to path as JSON.
+
+    Returns
+    -------
+    AssetMap
+    """
+    print("\n\nFingerprinting static files")
+    print("==================================")
+
+    urls = {}
+    current = set()
+    count = reused = 0
+    for output, entry in list(manifest.outputs.items()):
+        if entry["kind"] != "asset":
+            continue
+        asset_file = Path(output)
+        if not asset_file.is_file():
+            continue
+
+        # the hash of the copy, which may differ from its source, e.g. minified
+        name = fingerprinted_name(asset_file.name, manifest.hash(asset_file))
+        dst_file = asset_file.with_name(name)
+        current.add(str(dst_file))
+        urls["/" + asset_file.relative_to(dst).as_posix()] = (
+            "/" + dst_file.relative_to(dst).as_posix()
+        )
+        if manifest.is_fresh(dst_file, [asset_file]):
+            reused += 1
+            continue
+
+        dst_file.unlink(missing_ok=True)
+        try:
+            dst_file.hardlink_to(asset_file)
+        except OSError:
+            shutil.copy2(asset_file, dst_file)
+        manifest.record(dst_file, [asset_file], kind="fingerprinted")
+        count += 1
+        print(f"🔖 {dst_file}")
+
+    # copies of changed or removed files
+    for output, entry in list(manifest.outputs.items()):
+        if entry["kind"] == "fingerprinted" and output not in current:
+            Path(output).unlink(missing_ok=True)
+            manifest.forget(Path(output))
+            print(f"🗑️ {output} (Removed - '{entry['source']}' changed or is gone)")
+
+    # only written when it changes, so unchanged builds leave it alone
+    text = json.dumps(urls, indent=2, sort_keys=True)
+    if not path.is_file() or path.read_text() != text:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        path.write_text(text)
+
+    print(f"🔖 {count} file(s) fingerprinted")
+    print(f"⏩ {reused} file(s) unchanged")
+    return AssetMap(urls, dst, path)
+
+
+_active = None
+
+
+def enable_fingerprints(assets: AssetMap):
+    """Makes pages rendered in this process use fingerprinted URLs, also used
+    to set up workers."""
+    global _active
+    _active = assets
+
+
+def disable_fingerprints():
+    global _active
+    _active = None
+
+
+def active_assets():
+    """Returns the AssetMap in use or None."""
+    return _active
@@ -0,0 +1,162 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+# the site is built into numbered generations, public/ links to one of them
+GENERATIONS = Path(".build/generations")
+
+
+def list_generations(root: Path = GENERATIONS) -> list:
+    """Returns the generation directories in root, oldest first."""
+    if not root.is_dir():
+        return []
+    return sorted(
+        (path for path in root.iterdir() if path.name.isdigit() and path.is_dir()),
+        key=lambda path: int(path.name),
+    )
+
+
+def current_generation(link: Path = Path("public/"), root: Path = GENERATIONS):
+    """Returns the generation link points to or None."""
+    if not link.is_symlink():
+        return None
+    target = link.resolve()
+    for generation in list_generations(root):
+        if generation.resolve() == target:
+            return generation
+    return None
+
+
+def generation_manifest(generation: Path) -> Path:
+    """Returns the file the build manifest of a generation is kept in.
+
+    It is next to the generation rather than in it, as the generation
+    is served.
+    """
+    return generation.with_name(f"{generation.name}.json")
+
+
+def _remove_generation(generation: Path) -> None:
+    shutil.rmtree(generation)
+    generation_manifest(generation).unlink(missing_ok=True)
+
+
+def _next_generation(root: Path) -> Path:
+    generations = list_generations(root)
+    number = int(generations[-1].name) + 1 if generations else 1
+    return root / f"{number:04d}"
+
+
+def swap_generation(generation: Path, link: Path = Path("public/")) -> None:
+    """Points link to generation in one step.
+
+    The new symlink replaces the old one with a rename, so a server
+    reading from link sees either the old or the new generation.
+    """
+    tmp = link.with_name(link.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    tmp.symlink_to(os.path.relpath(generation, link.parent), target_is_directory=True)
+    tmp.replace(link)
+
+
+def _link_tree(src: Path, dst: Path) -> int:
+    """Hardlinks all files of src into the same places below dst."""
+    count = 0
+    for directory, _, files in os.walk(src):
+        target = dst / Path(directory).relative_to(src)
+        target.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            try:
+                os.link(Path(directory) / name, target / name)
+            except OSError:
+                # e.g. a filesystem without hardlinks -> copy instead
+                shutil.copy2(Path(directory) / name, target / name)
+            count += 1
+    return count
+
+
+def stage_generation(
+    link: Path = Path("public/"), root: Path = GENERATIONS, reuse: bool = True
+) -> Path:
+    """Creates the directory the next generation is built in.
+
+    With reuse, it starts out with hardlinks of all files of the current
+    generation, so only changed files are written. Files are replaced
+    rather than written into, so the current generation never changes.
+    A link that is still a real directory becomes the first generation.
+
+    Returns
+    -------
+    Path
+        the new generation, linked to by nothing yet
+    """
+    print("\n\nStaging generation")
+    print("==================================")
+
+    if link.is_dir() and not link.is_symlink():
+        adopted = _next_generation(root)
+        adopted.parent.mkdir(parents=True, exist_ok=True)
+        link.rename(adopted)
+        swap_generation(adopted, link)
+        print(f"📦 {link} (Moved to '{adopted}')")
+
+    staging = _next_generation(root)
+    current = current_generation(link, root)
+    start = time.perf_counter()
+    count = 0
+    if reuse and current is not None:
+        count = _link_tree(current, staging)
+    staging.mkdir(parents=True, exist_ok=True)
+    duration = (time.perf_counter() - start) * 1000
+    print(f"🗂️ {staging} ({count} file(s) linked in {duration:.1f} ms)")
+    return staging
+
+
+def prune_generations(
+    keep: int, link: Path = Path("public/"), root: Path = GENERATIONS
+) -> None:
+    """Deletes all but the keep newest generations before the current one.
+
+    Generations newer than the current one are left over from failed
+    builds and deleted too.
+    """
+    current = current_generation(link, root)
+    if current is None:
+        return
+    older = []
+    for generation in list_generations(root):
+        if int(generation.name) < int(current.name):
+            older.append(generation)
+        elif generation != current:
+            _remove_generation(generation)
+            print(f"🗑️ {generation} (Removed - unfinished build)")
+    for generation in older[: max(len(older) - keep, 0)]:
+        _remove_generation(generation)
+        print(f"🗑️ {generation} (Removed - old generation)")
+
+
+def rollback(link: Path = Path("public/"), root: Path = GENERATIONS):
+    """Points link back to the generation before the current one.
+
+    The current generation is deleted, so rolling back again goes one
+    further back.
+
+    Returns
+    -------
+    Path
+        the generation link points to now or None if there is none
+    """
+    current = current_generation(link, root)
+    if current is None:
+        return None
+    older = [
+        generation
+        for generation in list_generations(root)
+        if int(generation.name) < int(current.name)
+    ]
+    if not older:
+        return None
+    swap_generation(older[-1], link)
+    _remove_generation(current)
+    return older[-1]
@@ -1,4 +1,9 @@
+import io
+
+
 class HTMLNode:
+    # no per-instance __dict__, pages hold a lot of nodes
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(
         self,
@@ -13,6 +18,12 @@ class HTMLNode:
         self.props = props
 
     def to_html(self):
+        buffer = io.StringIO()
+        self.write_html(buffer)
+        return buffer.getvalue()
+
+    def write_html(self, stream):
+        """Writes the HTML of the node to a stream (anything with .write)."""
         raise NotImplementedError
 
     def props_to_html(self):
@@ -26,6 +37,7 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(
             self, tag: str = None, value: str = None, props: dict = None
@@ -37,14 +49,15 @@ class LeafNode(HTMLNode):
         super().__init__(tag, value, None, props)
 
 
-    def to_html(self):
+    def write_html(self, stream):
         if self.tag is None:
-            return f"{self.value}"
+            stream.write(f"{self.value}")
         else:
-            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            stream.write(f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>")
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(
         self, tag: str = None, children: list = None, props: dict = None
@@ -58,7 +71,9 @@ class ParentNode(HTMLNode):
 
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
-
-        children_html = "".join(child.to_html() for child in self.children)
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+    def write_html(self, stream):
+        # children write straight into the stream, no intermediate strings
+        stream.write(f"<{self.tag}{self.props_to_html()}>")
+        for child in self.children:
+            child.write_html(stream)
+        stream.write(f"</{self.tag}>")
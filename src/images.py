@@ -0,0 +1,226 @@
+import json
+import posixpath
+import re
+import struct
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from manifest import BuildManifest
+
+IMAGE_SUFFIXES = {".png", ".gif", ".jpg", ".jpeg", ".webp"}
+# opening <img> tags and their src
+_IMG = re.compile(r"<img\s[^>]*>")
+_SRC = re.compile(r'\bsrc="([^"]*)"')
+
+
+def _jpeg_size(f):
+    # walks the segments up to the first start of frame (SOFn) marker
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            # markers without a segment
+            continue
+        if marker in (0xD9, 0xDA):
+            # end of image or start of scan before any frame
+            return None
+        (length,) = struct.unpack(">H", f.read(2))
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            _, height, width = struct.unpack(">BHH", f.read(5))
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def read_image_size(path: Path):
+    """Reads the size of a PNG, GIF, WebP or JPEG image from its header.
+
+    Only the header is read, the image is never decoded.
+
+    Returns
+    -------
+    tuple
+        (width, height) or None if the format is unknown or broken
+    """
+    with path.open("rb") as f:
+        head = f.read(32)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _webp_size(head)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                return _jpeg_size(f)
+        except struct.error:
+            # file ends within the header
+            return None
+    return None
+
+
+class ImageMap:
+    """Sizes of the images among the static files by URL.
+
+    root is the output directory the URLs are relative to and path the
+    JSON file the sizes were written to.
+    """
+
+    def __init__(
+        self,
+        sizes: dict,
+        root: Path = Path("public/"),
+        path: Path = Path(".build/images.json"),
+    ) -> None:
+        # {url: [width, height] or None if unknown}
+        self.sizes = sizes
+        self.root = root
+        self.path = path
+
+    def add_attributes(self, html: str, base: str = "/", warnings: list = None) -> str:
+        """Adds width, height, loading and decoding to local <img> tags in html.
+
+        Relative src are resolved against base, the URL of the directory
+        of the page. Remote and missing images are left as they are and
+        appended to warnings.
+        """
+
+        def replace(match):
+            tag = match[0]
+            src = _SRC.search(tag)
+            if src is None:
+                return tag
+            parts = urlsplit(src[1])
+            if parts.scheme or parts.netloc:
+                if warnings is not None:
+                    warnings.append(f"remote image '{src[1]}'")
+                return tag
+            url = posixpath.normpath(posixpath.join(base, parts.path))
+            if url not in self.sizes:
+                if warnings is not None:
+                    warnings.append(f"missing image '{src[1]}'")
+                return tag
+
+            attributes = ""
+            size = self.sizes[url]
+            if size is not None and " width=" not in tag and " height=" not in tag:
+                attributes += f' width="{size[0]}" height="{size[1]}"'
+            if " loading=" not in tag:
+                attributes += ' loading="lazy"'
+            if " decoding=" not in tag:
+                attributes += ' decoding="async"'
+            # after the last attribute, before " />" or ">"
+            end = len(tag[: -2 if tag.endswith("/>") else -1].rstrip())
+            return f"{tag[:end]}{attributes}{tag[end:]}"
+
+        return _IMG.sub(replace, html)
+
+    def writer(self, stream, dst: Path, warnings: list = None):
+        """Wraps a stream a page at dst is written to, adding image attributes."""
+        base = "/" + dst.parent.relative_to(self.root).as_posix() + "/"
+        return _ImageWriter(stream, self, base.replace("/./", "/"), warnings)
+
+
+class _ImageWriter:
+    # nodes and templates write whole tags at once, so no tag is split
+    # across two writes
+
+    def __init__(self, stream, images: ImageMap, base: str, warnings: list) -> None:
+        self.stream = stream
+        self.images = images
+        self.base = base
+        self.warnings = warnings
+
+    def write(self, text: str):
+        return self.stream.write(
+            self.images.add_attributes(text, self.base, self.warnings)
+        )
+
+
+def image_sizes(
+    manifest: BuildManifest,
+    dst: Path = Path("public/"),
+    path: Path = Path(".build/images.json"),
+) -> ImageMap:
+    """Reads the sizes of all static images, reusing cached sizes.
+
+    Sizes are written to path by URL and by content hash, so an image is
+    only read again when it changes.
+
+    Returns
+    -------
+    ImageMap
+    """
+    cached = {}
+    if path.is_file():
+        try:
+            cached = json.loads(path.read_text())["hashes"]
+        except (ValueError, KeyError, TypeError):
+            print(f"⚠️ Ignoring unreadable image sizes '{path}'")
+
+    sizes = {}
+    hashes = {}
+    for output, entry in manifest.outputs.items():
+        image_file = Path(output)
+        src_file = Path(entry["source"])
+        if (
+            entry["kind"] != "asset"
+            or image_file.suffix.lower() not in IMAGE_SUFFIXES
+            or not src_file.is_file()
+        ):
+            continue
+
+        digest = manifest.hash(src_file)
+        if digest not in cached:
+            size = read_image_size(src_file)
+            cached[digest] = list(size) if size is not None else None
+        hashes[digest] = cached[digest]
+        sizes["/" + image_file.relative_to(dst).as_posix()] = hashes[digest]
+
+    # only written when it changes, so unchanged builds leave it alone
+    text = json.dumps({"sizes": sizes, "hashes": hashes}, indent=2, sort_keys=True)
+    if not path.is_file() or path.read_text() != text:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return ImageMap(sizes, dst, path)
+
+
+_active = None
+
+
+def enable_images(images: ImageMap):
+    """Makes pages rendered in this process get image attributes, also used
+    to set up workers."""
+    global _active
+    _active = images
+
+
+def disable_images():
+    global _active
+    _active = None
+
+
+def active_images():
+    """Returns the ImageMap in use or None."""
+    return _active
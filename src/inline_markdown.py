@@ -1,7 +1,7 @@
 import re
 
 from textnode import TextNode, TextType
-from htmlnode import LeafNode
+from htmlnode import LeafNode, ParentNode
 
 
 def text_node_to_html_node(text_node):
@@ -14,6 +14,8 @@ def text_node_to_html_node(text_node):
             return LeafNode("b", text_node.text, None)
         case TextType.ITALIC:
             return LeafNode("i", text_node.text, None)
+        case TextType.BOLD_ITALIC:
+            return ParentNode("b", [LeafNode("i", text_node.text, None)])
         case TextType.CODE:
             return LeafNode("code", text_node.text, None)
         case TextType.LINK:
@@ -183,14 +185,152 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
+# next character that can start inline markdown
+_INLINE_START = re.compile(r"[*`!\[]")
+# end of the text images and links can span, like split_nodes_delimiter
+_DELIMITER = re.compile(r"[*`]")
+
+_EMPHASIS_TYPES = {
+    (False, False): TextType.TEXT,
+    (True, False): TextType.BOLD,
+    (False, True): TextType.ITALIC,
+    (True, True): TextType.BOLD_ITALIC,
+}
+
+
+class _Finder:
+    # finds the next sub at or after positions that never decrease, so
+    # the text is searched once instead of once per position
+
+    def __init__(self, text: str, sub: str) -> None:
+        self.text = text
+        self.sub = sub
+        self.found = -1
+
+    def find(self, pos: int) -> int:
+        """Returns the index of the next sub at or after pos or len(text)."""
+        if self.found < pos:
+            self.found = self.text.find(self.sub, pos)
+            if self.found == -1:
+                self.found = len(self.text)
+        return self.found
+
+
+class _References:
+    # matches [text](url) like extract_markdown_links: text ends at the
+    # first "](", url at the next ")" and neither spans a line break
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.closes = _Finder(text, "](")
+        self.parens = _Finder(text, ")")
+        self.text_breaks = _Finder(text, "\n")
+        self.url_breaks = _Finder(text, "\n")
+
+    def match(self, start: int, end: int):
+        """Returns (text, url, end of the match) of the reference with its
+        "[" at start, if it ends by end, or None. start never decreases."""
+        close = self.closes.find(start + 1)
+        paren = self.parens.find(close + 2)
+        if (
+            paren >= end
+            or self.text_breaks.find(start + 1) < close
+            or self.url_breaks.find(close + 2) < paren
+        ):
+            return None
+        return self.text[start + 1 : close], self.text[close + 2 : paren], paren + 1
+
+
 def text_to_textnodes(text):
-    """Converts text into a list of TextNodes."""
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    """Converts text into a list of TextNodes.
+
+    Scans the text once from left to right, jumping from one possible
+    delimiter to the next. Bold and italic can be nested, code spans,
+    images and links are taken as they are. Images are found before
+    links, so a link never contains an image, e.g. in [![alt](src)](url).
+    Brackets that are no link are not scanned past again, so the time is
+    linear in the length of the text.
+    """
+    nodes = []
+    bold = italic = False
+    # start of the current run of plain (or emphasized) text
+    start = 0
+    # end of the text between delimiters and the next image in it:
+    # (start, (alt, url, end)) or None
+    segment_end = -1
+    image = None
+    images = _References(text)
+    links = _References(text)
+    bangs = _Finder(text, "![")
+
+    def flush(end):
+        if end > start:
+            nodes.append(TextNode(text[start:end], _EMPHASIS_TYPES[(bold, italic)]))
+
+    def next_image(pos):
+        at = bangs.find(pos)
+        while at < segment_end:
+            reference = images.match(at + 1, segment_end)
+            if reference is not None:
+                return at, reference
+            at = bangs.find(at + 1)
+        return None
+
+    match = _INLINE_START.search(text)
+    while match:
+        i = match.start()
+        char = text[i]
+
+        if char == "*":
+            flush(i)
+            if text.startswith("**", i):
+                bold = not bold
+                start = i + 2
+            else:
+                italic = not italic
+                start = i + 1
+            next_i = start
+
+        elif char == "`":
+            end = text.find("`", i + 1)
+            if end == -1:
+                raise Exception(f'Invalid Markdown: "{text}"')
+            flush(i)
+            if end > i + 1:
+                nodes.append(TextNode(text[i + 1 : end], TextType.CODE))
+            start = next_i = end + 1
+
+        else:
+            if i > segment_end:
+                delimiter = _DELIMITER.search(text, i)
+                segment_end = delimiter.start() if delimiter else len(text)
+                image = next_image(i)
+            elif image is not None and image[0] < i:
+                image = next_image(i)
+
+            if image is not None and image[0] == i:
+                reference, text_type = image[1], TextType.IMAGE
+            elif char == "[":
+                # a link ends before the next image
+                end = image[0] if image is not None else segment_end
+                reference, text_type = links.match(i, end), TextType.LINK
+            else:
+                reference = None
+
+            # "!" without an image or "[" without a link are just text
+            if reference is None:
+                next_i = i + 1
+            else:
+                flush(i)
+                nodes.append(TextNode(reference[0], text_type, reference[1]))
+                start = next_i = reference[2]
+
+        match = _INLINE_START.search(text, next_i)
+
+    if bold or italic:
+        raise Exception(f'Invalid Markdown: "{text}"')
+    flush(len(text))
+
     return nodes
 
 
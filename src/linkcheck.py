@@ -0,0 +1,97 @@
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from manifest import BuildManifest
+
+# targets of links, images and stylesheets: <a href>, <img src> and <link href>
+_TARGET = re.compile(r'<(?:a|img|link)\s[^>]*?\b(?:href|src)="([^"]*)"')
+_IMAGE = re.compile(r'<img\s[^>]*?\bsrc="([^"]*)"')
+
+
+class _LinkCollector:
+    # nodes and templates write whole tags at once, so no tag is split
+    # across two writes
+
+    def __init__(self, stream, links: list, images: list = None) -> None:
+        self.stream = stream
+        self.links = links
+        self.images = images
+
+    def write(self, text: str):
+        self.links.extend(_TARGET.findall(text))
+        if self.images is not None:
+            self.images.extend(_IMAGE.findall(text))
+        return self.stream.write(text)
+
+
+def collector(stream, links: list, images: list = None):
+    """Wraps a stream a page is written to, appending link targets to links
+    and, if given, the src of <img> tags to images."""
+    return _LinkCollector(stream, links, images)
+
+
+def page_url(dst_file: Path, dst: Path = Path("public/")) -> str:
+    """Returns the URL of an output file, e.g. /blog/post.html."""
+    return "/" + dst_file.relative_to(dst).as_posix()
+
+
+def resolve(link: str, base: str = "/"):
+    """Returns the path a link points to on this site or None if external.
+
+    Relative links are resolved against base, the URL of the page.
+    """
+    parts = urlsplit(link)
+    if parts.scheme or parts.netloc or not parts.path:
+        # other sites, mailto: and links within the page
+        return None
+    path = posixpath.normpath(posixpath.join(posixpath.dirname(base), parts.path))
+    if parts.path.endswith("/"):
+        path = posixpath.join(path, "index.html")
+    return unquote(path)
+
+
+def link_index(manifest: BuildManifest, dst: Path = Path("public/")) -> set:
+    """Returns the URLs of all pages and static files in the manifest."""
+    index = set()
+    for output in manifest.outputs:
+        output = Path(output)
+        if output.is_relative_to(dst):
+            url = page_url(output, dst)
+            index.add(url)
+            if output.name == "index.html":
+                # /blog is served as /blog/index.html
+                index.add(posixpath.dirname(url))
+    return index
+
+
+def check_links(manifest: BuildManifest, dst: Path = Path("public/")) -> list:
+    """Checks the recorded links of every page against the built site.
+
+    Returns
+    -------
+    list
+        list of tuples of dead links: [(src_file, link), ...]
+    """
+    print("\n\nChecking links")
+    print("==================================")
+
+    index = link_index(manifest, dst)
+    dead = []
+    checked = 0
+    for output, entry in manifest.outputs.items():
+        if not entry.get("links"):
+            continue
+        base = page_url(Path(output), dst)
+        for link in entry["links"]:
+            path = resolve(link, base)
+            if path is None:
+                continue
+            checked += 1
+            if path not in index:
+                dead.append((Path(entry["source"]), link))
+                print(f"❌ {entry['source']}: dead link '{link}'")
+
+    print(f"🔗 {checked} internal link(s) checked, {len(dead)} dead")
+    return dead
@@ -0,0 +1,166 @@
+import hashlib
+import re
+from html import escape
+from pathlib import Path
+
+from linkcheck import page_url
+from manifest import BuildManifest
+from markdown_to_html import page_depends, page_options, write_output
+from metadata import MetadataIndex
+from templates import load_template
+
+PER_PAGE = 10
+
+
+def tag_slug(tag: str) -> str:
+    """Returns the URL part of a tag, e.g. "Web Dev" -> "web-dev"."""
+    return re.sub(r"[^\w]+", "-", tag.lower()).strip("-") or "-"
+
+
+def listing_file(dst: Path, base: str, number: int) -> Path:
+    """Returns the file of page number of a listing, e.g. tags/web/2.html."""
+    name = "index.html" if number == 1 else f"{number}.html"
+    return dst / base.strip("/") / name
+
+
+def published_pages(
+    metadata: MetadataIndex, manifest: BuildManifest, dst: Path = Path("public/")
+) -> list:
+    """Returns the built pages that are not drafts, newest first.
+
+    Pages without a date come last, pages of the same date by URL.
+
+    Returns
+    -------
+    list
+        list of tuples: [(url, metadata), ...]
+    """
+    pages = []
+    for output, entry in manifest.outputs.items():
+        cached = metadata.pages.get(entry["source"])
+        if entry["kind"] != "page" or cached is None or cached[2]["draft"]:
+            continue
+        pages.append((page_url(Path(output), dst), cached[2]))
+    pages.sort(key=lambda page: page[0])
+    pages.sort(key=lambda page: page[1]["date"] or "", reverse=True)
+    return pages
+
+
+def listing_html(pages: list, number: int, count: int, tags: list) -> str:
+    """Returns the content of page number of count of a listing."""
+    html = ['<ul class="listing">']
+    for url, page in pages:
+        item = f'<li><a href="{escape(url)}">{escape(page["title"] or url)}</a>'
+        if page["date"]:
+            item += f' <time datetime="{page["date"]}">{page["date"]}</time>'
+        html.append(item + "</li>")
+    html.append("</ul>")
+
+    links = []
+    if number > 1:
+        previous = "index.html" if number == 2 else f"{number - 1}.html"
+        links.append(f'<a href="{previous}" rel="prev">Newer</a>')
+    if number < count:
+        links.append(f'<a href="{number + 1}.html" rel="next">Older</a>')
+    if links:
+        html.append(f'<nav class="pagination">{" ".join(links)}</nav>')
+
+    if tags:
+        links = [
+            f'<a href="/tags/{tag_slug(tag)}/">{escape(tag)}</a>' for tag in tags
+        ]
+        html.append(f'<nav class="tags">{" ".join(links)}</nav>')
+    return "\n".join(html)
+
+
+def generate_listings(
+    metadata: MetadataIndex,
+    manifest: BuildManifest,
+    dst: Path = Path("public/"),
+    tmplt: Path = Path("template/template.html"),
+    per_page: int = PER_PAGE,
+) -> None:
+    """Writes paginated lists of all pages and of the pages of every tag.
+
+    Listings are made from the metadata index and rendered with the page
+    template, so no page has to be rendered for them. All pages are
+    listed in pages/, the ones of a tag in tags/<tag>/. Listings that
+    are unchanged and built from the same template are not written again.
+    """
+    print("\n\nGenerating listings")
+    print("==================================")
+
+    pages = published_pages(metadata, manifest, dst)
+    tags = {}
+    for url, page in pages:
+        for tag in page["tags"]:
+            tags.setdefault(tag, []).append((url, page))
+
+    listings = {"/pages": ("All pages", pages)}
+    for tag in sorted(tags):
+        listings[f"/tags/{tag_slug(tag)}"] = (f"Tagged '{tag}'", tags[tag])
+
+    template = load_template(tmplt)
+    inputs = template.files
+    written = set()
+    for base, (title, listed) in listings.items():
+        count = max(1, -(-len(listed) // per_page))
+        for number in range(1, count + 1):
+            dst_file = listing_file(dst, base, number)
+            chunk = listed[(number - 1) * per_page : number * per_page]
+            content = listing_html(
+                chunk,
+                number,
+                count,
+                sorted(tags) if base == "/pages" else [],
+            )
+            page_title = title if number == 1 else f"{title} ({number}/{count})"
+            written.add(str(dst_file))
+            # a listing has no source, what it shows is compared instead
+            digest = hashlib.sha256(f"{page_title}\n{content}".encode()).hexdigest()
+            options = {**(page_options() or {}), "listing": digest}
+            if manifest.is_fresh(dst_file, inputs, options):
+                print(f"⏩ {dst_file} (unchanged)")
+                continue
+            warnings, links, _ = write_output(
+                dst_file,
+                lambda stream: template.render(
+                    stream, Title=escape(page_title, quote=False), Content=content
+                ),
+            )
+            manifest.record(
+                dst_file,
+                inputs,
+                kind="listing",
+                options=options,
+                links=links,
+                depends=page_depends(dst_file, links, [], manifest),
+            )
+            print(f"✅ {dst_file} (listing of {len(chunk)} page(s))")
+            for warning in warnings:
+                print(f"⚠️ {dst_file}: {warning}")
+
+    remove_stale_listings(manifest, written, dst)
+    print(f"📇 {len(written)} listing page(s), {len(tags)} tag(s)")
+
+
+def remove_stale_listings(
+    manifest: BuildManifest,
+    written: set = frozenset(),
+    dst: Path = Path("public/"),
+):
+    """Deletes listing pages that were not written, e.g. of unused tags,
+    and the directories in dst they leave empty."""
+    for output, entry in list(manifest.outputs.items()):
+        if entry["kind"] == "listing" and output not in written:
+            Path(output).unlink(missing_ok=True)
+            manifest.forget(Path(output))
+            print(f"🗑️ {output} (Removed - listing is empty)")
+            directory = Path(output).parent
+            while (
+                dst in directory.parents
+                and directory.is_dir()
+                and not any(directory.iterdir())
+            ):
+                directory.rmdir()
+                directory = directory.parent
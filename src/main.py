@@ -1,7 +1,34 @@
+import argparse
 import shutil
+import sys
 from pathlib import Path
 
-from markdown_to_html import generate_pages_recursive
+import parse_cache
+import profiler
+from compress import compress_outputs
+from fingerprint import disable_fingerprints, enable_fingerprints, fingerprint_assets
+from generations import (
+    generation_manifest,
+    prune_generations,
+    rollback,
+    stage_generation,
+    swap_generation,
+)
+from images import disable_images, enable_images, image_sizes
+from linkcheck import check_links
+from listings import generate_listings, remove_stale_listings
+from minify import (
+    MINIFIERS,
+    disable_minify,
+    enable_minify,
+    minify_file,
+    minifying,
+    take_stats,
+)
+from manifest import BuildManifest
+from metadata import MetadataIndex
+from markdown_to_html import generate_pages_recursive, remove_stale_pages
+from search import SearchIndex, disable_search, enable_search
 
 
 def copy_files(
@@ -9,15 +36,26 @@ def copy_files(
     dst: Path = Path("public/"),
     fil_c: int = 0,
     fol_c: int = 0,
+    manifest: BuildManifest = None,
+    checksum: bool = False,
+    hardlink: bool = False,
 ):
-    """Copies files and folders from a src into a dst directory."""
+    """Copies files and folders from a src into a dst directory.
+
+    Without a manifest dst is wiped and everything is copied again.
+    With a manifest dst is synced: only new or changed files are copied,
+    compared by size and mtime or, with checksum, by content hash.
+    With hardlink, files are linked instead of copied where possible.
+    While minifying, CSS files are minified instead of copied.
+    """
     # log
     if fil_c == 0 and fol_c == 0:
         print(f"\nCopying static files from '{src}' to")
         print("====================================")
-    # Remove old dst directory and create new
-    shutil.rmtree(dst, ignore_errors=True)
-    Path.mkdir(dst)
+    # Remove old dst directory and create new, unless syncing into it
+    if manifest is None:
+        shutil.rmtree(dst, ignore_errors=True)
+    dst.mkdir(parents=True, exist_ok=True)
     # log folders
     if fol_c == 0:
         print(f"🗂️ {dst.name}")
@@ -29,24 +67,333 @@ def copy_files(
 
         if not src_file.is_file():
             fol_c += 1
-            copy_files(src_file, dst_file, fil_c, fol_c,)
+            copy_files(
+                src_file, dst_file, fil_c, fol_c, manifest, checksum, hardlink
+            )
             fol_c -= 1
         elif src_file.is_file() and src_file.name != ".DS_Store":
             fil_c += 1
-            shutil.copy(src_file, dst_file)
+            minified = minifying() and src_file.suffix in MINIFIERS
+            options = {"minify": True} if minified else None
+            if manifest is not None and is_unchanged(
+                src_file, dst_file, manifest, checksum, options
+            ):
+                status = " (unchanged)"
+            elif minified:
+                minify_file(src_file, dst_file)
+                status = " (minified)"
+            else:
+                copy_file(src_file, dst_file, hardlink)
+                status = ""
+            if manifest is not None:
+                manifest.record(dst_file, [src_file], kind="asset", options=options)
             # log files
             if fol_c == 0:
-                print(f"|- 📄{src_file.name}")
+                print(f"|- 📄{src_file.name}{status}")
             else:
-                print(f"|-{fol_c * "---"} 📄{src_file.name}")
+                print(f"|-{fol_c * "---"} 📄{src_file.name}{status}")
         else:
             continue
 
 
-def main():
-    copy_files()
-    generate_pages_recursive()
+def is_unchanged(
+    src_file: Path,
+    dst_file: Path,
+    manifest: BuildManifest,
+    checksum: bool = False,
+    options: dict = None,
+):
+    """Checks if dst_file is still an up to date copy of src_file.
+
+    Files built with options, e.g. minified ones, are always compared by
+    content hash, as their size differs from the source.
+    """
+    if not dst_file.is_file():
+        return False
+    if checksum or options is not None:
+        return manifest.is_fresh(dst_file, [src_file], options)
+
+    src_stat = src_file.stat()
+    dst_stat = dst_file.stat()
+    return (
+        src_stat.st_size == dst_stat.st_size
+        and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+    )
+
+
+def copy_file(src_file: Path, dst_file: Path, hardlink: bool = False):
+    """Copies a single file, keeping its mtime, or hardlinks it."""
+    # dst_file may be a hardlink of the source or of an older generation
+    dst_file.unlink(missing_ok=True)
+    if hardlink:
+        try:
+            dst_file.hardlink_to(src_file)
+            return
+        except OSError:
+            # e.g. src and dst on different filesystems -> copy instead
+            pass
+    shutil.copy2(src_file, dst_file)
+
+
+def remove_stale_files(manifest: BuildManifest):
+    """Deletes copied static files whose source is gone."""
+    for dst_file, src_file in manifest.stale("asset"):
+        dst_file.unlink(missing_ok=True)
+        manifest.forget(dst_file)
+        print(f"🗑️ {dst_file} (Removed - '{src_file}' is gone)")
+
+
+def rollback_site(public: Path = Path("public/")) -> bool:
+    """Points public/ back to the generation before the current one.
+
+    The manifest that generation was built with is restored, so the next
+    build knows its outputs and removes the ones whose source is gone.
+    Without one, the manifest is cleared and every page built again.
+    The search index state describes the newer generation and is deleted.
+    """
+    generation = rollback(public)
+    if generation is None:
+        print(f"❌ No generation of '{public}' to roll back to")
+        return False
+    manifest = BuildManifest(generation_manifest(generation))
+    manifest.path = Path(".build/manifest.json")
+    manifest.save()
+    Path(".build/search.json").unlink(missing_ok=True)
+    print(f"✅ '{public}' links to '{generation}' again")
+    return True
+
+
+def main(
+    clean: bool = False,
+    checksum: bool = False,
+    hardlink: bool = False,
+    jobs: int = 1,
+    compress: bool = False,
+    profile: bool = False,
+    fingerprint: bool = False,
+    minify: bool = False,
+    search: bool = False,
+    generations: int = None,
+    listings: bool = False,
+    explain: bool = False,
+    cache_dir: Path = Path(".build/parse_cache"),
+    cache_size: int = 256,
+):
+    """Builds the site, returns the list of pages that failed.
+
+    Rendered content is cached in cache_dir, up to cache_size MiB.
+    A cache_size of 0 turns the cache off. With fingerprint, static files
+    get copies with content hashed names that pages link to instead.
+    With minify, pages and CSS files are minified. With search, a search
+    index of all pages is written to public/search.
+
+    With generations, the site is built into a new directory that starts
+    out with hardlinks of the current one, and public/ is switched to it
+    by replacing a symlink once the build is done. That many previous
+    generations are kept to roll back to.
+
+    Front matter of all pages is kept in a metadata index, from which
+    listings writes paginated lists of all pages and of every tag.
+    With explain, the reasons every page is built again are logged.
+    """
+    if profile:
+        build_profiler = profiler.enable_profiling()
+    if cache_size > 0:
+        cache = parse_cache.enable_cache(cache_dir, cache_size * 1024 * 1024)
+    if minify:
+        enable_minify()
+
+    public = Path("public/")
+    with profiler.phase("build"):
+        with profiler.phase("load manifest"):
+            manifest = BuildManifest()
+            metadata = MetadataIndex()
+        if clean:
+            if generations is None and public.is_symlink():
+                public.unlink()
+            elif generations is None:
+                shutil.rmtree(public, ignore_errors=True)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            manifest.clear()
+            metadata.clear()
+
+        out = public
+        if generations is not None:
+            with profiler.phase("stage generation"):
+                out = stage_generation(public, reuse=not clean)
+                manifest.move(public, out)
+
+        with profiler.phase("copy_files"):
+            copy_files(
+                dst=out, manifest=manifest, checksum=checksum, hardlink=hardlink
+            )
+            remove_stale_files(manifest)
+        if minify:
+            saved = take_stats().get("minify_bytes_saved", 0)
+            print(f"\n🪶 Minified static files: {saved} bytes saved")
+        if fingerprint:
+            with profiler.phase("fingerprint_assets"):
+                enable_fingerprints(
+                    fingerprint_assets(manifest, out, out / "assets.json")
+                )
+        with profiler.phase("image_sizes"):
+            enable_images(image_sizes(manifest, out))
+        if search:
+            index = SearchIndex(out, out / "search")
+            enable_search(index)
+        with profiler.phase("generate_pages_recursive"):
+            errors = generate_pages_recursive(
+                dst=out,
+                manifest=manifest,
+                jobs=jobs,
+                metadata=metadata,
+                explain=explain,
+                # no index to update, so every page is counted again
+                force=search and index.is_empty(),
+            )
+            remove_stale_pages(manifest)
+        if listings:
+            with profiler.phase("generate_listings"):
+                generate_listings(metadata, manifest, out)
+        else:
+            remove_stale_listings(manifest, dst=out)
+        with profiler.phase("check_links"):
+            check_links(manifest, out)
+        if search:
+            with profiler.phase("search index"):
+                index.sync(manifest)
+                index.write()
+        if compress:
+            with profiler.phase("compress_outputs"):
+                compress_outputs(manifest)
+        if generations is not None:
+            with profiler.phase("swap generation"):
+                print("\n\nSwapping generation")
+                print("==================================")
+                swap_generation(out, public)
+                manifest.move(out, public)
+                print(f"✅ '{public}' links to '{out}'")
+                prune_generations(generations, public)
+        with profiler.phase("save manifest"):
+            manifest.save()
+            metadata.save()
+            if generations is not None:
+                # restored by rollback_site
+                shutil.copyfile(manifest.path, generation_manifest(out))
+        disable_fingerprints()
+        disable_images()
+        disable_minify()
+        disable_search()
+        if cache_size > 0:
+            with profiler.phase("evict parse cache"):
+                cache.evict()
+            parse_cache.disable_cache()
+
+    if profile:
+        build_profiler.report()
+        build_profiler.write_trace()
+        profiler.disable_profiling()
+    return errors
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Static Site Generator")
+    parser.add_argument(
+        "--clean", action="store_true", help="Rebuild everything from scratch"
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="Compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="Hardlink static files into public/ instead of copying them",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of processes to render pages with",
+        default=1,
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Write precompressed .gz (and .br) files next to HTML and CSS",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report time per phase and page, write a trace to .build/profile.json",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Link pages to copies of static files with content hashed names",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Minify generated pages and CSS files",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Write a search index of all pages to public/search",
+    )
+    parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="Write paginated lists of all pages and of every tag",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Log why every page is built again",
+    )
+    parser.add_argument(
+        "--generations",
+        type=int,
+        metavar="N",
+        help="Build into a new directory, switch public/ to it when done "
+        "and keep N previous ones",
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Switch public/ back to the previous generation and exit",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Directory of the parse cache",
+        default=Path(".build/parse_cache"),
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        help="Max size of the parse cache in MiB, 0 turns it off",
+        default=256,
+    )
+    args = parser.parse_args()
+    if args.rollback:
+        sys.exit(0 if rollback_site() else 1)
+
+    errors = main(
+        clean=args.clean,
+        checksum=args.checksum,
+        hardlink=args.hardlink,
+        jobs=args.jobs,
+        compress=args.compress,
+        profile=args.profile,
+        fingerprint=args.fingerprint,
+        minify=args.minify,
+        search=args.search,
+        generations=args.generations,
+        listings=args.listings,
+        explain=args.explain,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size,
+    )
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def file_hash(path: Path) -> str:
+    """Returns the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Persistent record of which inputs every output was built from.
+
+    Maps each output path to the content hashes of its inputs, so a
+    build can skip outputs whose inputs did not change and find outputs
+    whose source is gone. Hashes are cached by mtime and size, so an
+    unchanged file is only hashed once.
+    """
+
+    def __init__(self, path: Path = Path(".build/manifest.json")) -> None:
+        self.path = path
+        self.outputs = {}
+        self.stats = {}
+
+        if path.is_file():
+            try:
+                data = json.loads(path.read_text())
+                self.outputs = data.get("outputs", {})
+                self.stats = data.get("stats", {})
+            except (ValueError, AttributeError):
+                # corrupt manifest -> behave like a clean build
+                print(f"⚠️ Ignoring unreadable build manifest '{path}'")
+
+    def hash(self, path: Path) -> str:
+        """Returns the content hash of path, reusing it if mtime and size match."""
+        stat = path.stat()
+        cached = self.stats.get(str(path))
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        digest = file_hash(path)
+        self.stats[str(path)] = [stat.st_mtime_ns, stat.st_size, digest]
+        return digest
+
+    def is_fresh(self, dst: Path, inputs: list, options: dict = None) -> bool:
+        """Checks if dst exists and was built from exactly these inputs.
+
+        options are settings dst was built with, e.g. {"minify": True}.
+        Files dst was recorded to depend on must be unchanged too.
+        """
+        return not self.explain(dst, inputs, options)
+
+    def explain(self, dst: Path, inputs: list, options: dict = None) -> list:
+        """Returns why dst has to be built again, see is_fresh.
+
+        Returns
+        -------
+        list
+            list of reasons, empty if dst is fresh
+        """
+        entry = self.outputs.get(str(dst))
+        if entry is None:
+            return ["not built before"]
+        if not dst.is_file():
+            return ["output is missing"]
+
+        reasons = []
+        if entry.get("options") != options:
+            reasons.append(f"options changed ({entry.get('options')} -> {options})")
+        recorded = entry["inputs"]
+        current = {str(path) for path in inputs}
+        for path in sorted(current - set(recorded)):
+            reasons.append(f"'{path}' is a new input")
+        for path in sorted(set(recorded) - current):
+            reasons.append(f"'{path}' is no longer an input")
+        for path in inputs:
+            if str(path) not in recorded:
+                continue
+            if not path.is_file():
+                reasons.append(f"'{path}' is missing")
+            elif self.hash(path) != recorded[str(path)]:
+                reasons.append(f"'{path}' changed")
+
+        for path, digest in entry.get("depends", {}).items():
+            path = Path(path)
+            if not path.is_file():
+                if digest is not None:
+                    reasons.append(f"'{path}' is gone")
+            elif digest is None:
+                reasons.append(f"'{path}' appeared")
+            elif self.hash(path) != digest:
+                reasons.append(f"'{path}' changed")
+        return reasons
+
+    def record(
+        self,
+        dst: Path,
+        inputs: list,
+        kind: str = "page",
+        options: dict = None,
+        links: list = None,
+        depends: list = None,
+    ) -> None:
+        """Records that dst was built from inputs. The first input is its source.
+
+        links are the link targets of a page, checked by check_links.
+        depends are files found while building dst, e.g. images it shows,
+        which may not exist (yet).
+        """
+        self.outputs[str(dst)] = {
+            "kind": kind,
+            "source": str(inputs[0]),
+            "inputs": {str(path): self.hash(path) for path in inputs},
+        }
+        if options is not None:
+            self.outputs[str(dst)]["options"] = options
+        if links:
+            self.outputs[str(dst)]["links"] = links
+        if depends:
+            self.outputs[str(dst)]["depends"] = {
+                str(path): self.hash(path) if path.is_file() else None
+                for path in depends
+            }
+
+    def clear(self) -> None:
+        """Forgets all outputs, so the next build starts from scratch."""
+        self.outputs = {}
+
+    def forget(self, dst: Path) -> None:
+        self.outputs.pop(str(dst), None)
+
+    def move(self, old: Path, new: Path) -> None:
+        """Moves recorded paths below old to new, e.g. to a copy of old."""
+
+        def moved(path: str) -> str:
+            if Path(path).is_relative_to(old):
+                return str(new / Path(path).relative_to(old))
+            return path
+
+        for output, entry in list(self.outputs.items()):
+            del self.outputs[output]
+            entry["source"] = moved(entry["source"])
+            for field in ("inputs", "depends"):
+                if field in entry:
+                    entry[field] = {
+                        moved(path): digest for path, digest in entry[field].items()
+                    }
+            self.outputs[moved(output)] = entry
+        self.stats = {moved(path): stat for path, stat in self.stats.items()}
+
+    def stale(self, kind: str = "page") -> list:
+        """Returns outputs of a kind whose source file no longer exists.
+
+        Returns
+        -------
+        list
+            list of tuples: [(output, source), ...]
+        """
+        return [
+            (Path(output), Path(entry["source"]))
+            for output, entry in self.outputs.items()
+            if entry["kind"] == kind and not Path(entry["source"]).is_file()
+        ]
+
+    def save(self) -> None:
+        # only keep hashes of files that are still referenced
+        inputs = {
+            path
+            for entry in self.outputs.values()
+            for path in [*entry["inputs"], *entry.get("depends", {})]
+        }
+        self.stats = {path: stat for path, stat in self.stats.items() if path in inputs}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"outputs": self.outputs, "stats": self.stats}))
+        tmp.replace(self.path)
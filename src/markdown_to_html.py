@@ -1,59 +1,503 @@
+import io
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from block_markdown import markdown_to_html_node
+from block_markdown import markdown_to_html_node, write_markdown_html
+import fingerprint
+import images
+import linkcheck
+import minify
+import parse_cache
+import profiler
+import search
+from manifest import BuildManifest
+from metadata import MetadataIndex, read_front_matter, read_header, split_front_matter
+from templates import load_template
 
 
 def extract_title(markdown):
     h1_pattern = r"^\s*#\s+(.*)$"
-    matches = re.findall(h1_pattern, markdown, flags=re.MULTILINE)
+    # only the first H1 is needed, so stop searching there
+    match = re.search(h1_pattern, markdown, flags=re.MULTILINE)
 
-    if matches:
-        return matches[0]
+    if match:
+        return match[1]
     else:
         raise Exception("All pages need a single H1 heading")
 
 
-def generate_page(
+# pages larger than this are converted while reading instead of all at once
+STREAM_SIZE = 16 * 1024 * 1024
+
+
+class MarkdownFile:
+    """Content of a markdown file that is converted while being written.
+
+    Templates write it with write_html() like an HTMLNode. Front matter
+    is skipped.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def write_html(self, stream):
+        with self.path.open() as f:
+            _, lines = read_front_matter(f)
+            write_markdown_html(stream, lines)
+
+
+def write_page(
+    stream,
     src: Path = Path("content/index.md"),
     tmplt: Path = Path("template/template.html"),
-    dst: Path = Path("public/index.html"),
+    metadata: dict = None,
 ):
-    markdown = src.read_text()
-    template = tmplt.read_text()
-    title = extract_title(markdown)
-    content = markdown_to_html_node(markdown).to_html()
-    html = template.replace("{{ Title }}", f"{title}")
-    html = html.replace("{{ Content }}", f"{content}")
+    """Renders a markdown page into the template and writes it to a stream.
+
+    With the parse cache enabled, the content HTML of markdown that was
+    rendered before is reused instead of parsed again. Pages larger than
+    STREAM_SIZE are never read as a whole and bypass the cache. The title
+    is taken from metadata, see read_header, which is read if not given.
 
+    Returns
+    -------
+    str
+        title of the page
+    """
+    if metadata is None:
+        metadata = read_header(src)
+    title = metadata["title"]
+    if title is None:
+        raise Exception("All pages need a single H1 heading")
+    template = load_template(tmplt)
+    if src.stat().st_size > STREAM_SIZE:
+        template.render(stream, Title=title, Content=MarkdownFile(src))
+        return title
+
+    _, markdown = split_front_matter(src.read_text())
+
+    cache = parse_cache.active_cache()
+    if cache is None:
+        # content is streamed instead of built as a string
+        content = markdown_to_html_node(markdown)
+    else:
+        content = cache.get(markdown)
+        if content is None:
+            content = markdown_to_html_node(markdown, cache.blocks).to_html()
+            cache.put(markdown, content)
+            cache.blocks.flush()
+    template.render(stream, Title=title, Content=content)
+    return title
+
+
+def write_output(dst: Path, write, buffered: bool = True, image_links: list = None):
+    """Writes an HTML file with write(stream), through the active writers.
+
+    Static file references are rewritten and links collected while the
+    HTML is written, the src of images into image_links if it is given.
+    While minifying, buffered output is rendered into memory first and
+    then minified.
+
+    Returns
+    -------
+    tuple
+        (list of warnings, e.g. images that are missing,
+        sorted list of the targets of links and images,
+        what write returned)
+    """
     dst.parent.mkdir(parents=True, exist_ok=True)
+    warnings = []
+    links = []
+    buffered = buffered and minify.minifying()
+    # dst may be a hardlink into an older generation, so never write into it
+    dst.unlink(missing_ok=True)
     with dst.open("w") as f:
-        f.write(html)
+        out = io.StringIO() if buffered else f
+        stream = out
+        assets = fingerprint.active_assets()
+        if assets is not None:
+            stream = assets.writer(stream, dst)
+        # sees the original URLs, so it goes around the asset writer
+        image_map = images.active_images()
+        if image_map is not None:
+            stream = image_map.writer(stream, dst, warnings)
+        stream = linkcheck.collector(stream, links, image_links)
+        result = write(stream)
+        if out is not f:
+            f.write(minify.minify_text(out.getvalue(), ".html"))
+    # same image referenced twice -> warned about once
+    return list(dict.fromkeys(warnings)), sorted(set(links)), result
+
+
+def render_page(
+    src: Path = Path("content/index.md"),
+    tmplt: Path = Path("template/template.html"),
+    dst: Path = Path("public/index.html"),
+    metadata: dict = None,
+):
+    """Renders a markdown page into the template and writes it to dst,
+    with its metadata if it is given, see write_page.
+
+    Returns
+    -------
+    tuple
+        (list of warnings about the page, e.g. images that are missing,
+        sorted list of the targets of its links and images,
+        sorted list of the targets of its images,
+        (title, {term: count}) for the search index or None)
+    """
+    image_links = []
+    # minified pages are rendered into memory first, except streamed ones
+    warnings, links, title = write_output(
+        dst,
+        lambda stream: write_page(stream, src, tmplt, metadata),
+        buffered=src.stat().st_size <= STREAM_SIZE,
+        image_links=image_links,
+    )
+    document = None
+    if search.indexing():
+        document = (title, search.count_terms(src))
+    return warnings, links, sorted(set(image_links)), document
+
+
+def page_template(metadata: dict, tmplt: Path) -> Path:
+    """Returns the template named in the front matter of a page, relative
+    to the directory of tmplt, or tmplt if there is none."""
+    if metadata.get("template"):
+        return tmplt.parent / metadata["template"]
+    return tmplt
+
+
+def page_inputs(src: Path, tmplt: Path) -> list:
+    """Returns the files a page is built from: its source first, then the
+    template with its layouts and partials."""
+    return [src, *load_template(tmplt).files]
+
+
+def page_depends(
+    dst: Path, links: list, image_links: list, manifest: BuildManifest
+) -> list:
+    """Returns the static files written into a page, see BuildManifest.record.
+
+    Fingerprinted names of all static files a page links to are written
+    into it, sizes only of its images, so it has to be built again when
+    one of them changes or is gone. Only static files in the manifest
+    count, links to pages and to nothing don't change the page.
+    """
+    assets = fingerprint.active_assets()
+    if assets is not None:
+        root, targets = assets.root, links
+    elif images.active_images() is not None:
+        root, targets = images.active_images().root, image_links
+    else:
+        return []
+    base = linkcheck.page_url(dst, root)
+    depends = set()
+    for link in targets:
+        path = linkcheck.resolve(link, base)
+        if path is None:
+            continue
+        path = root / path.lstrip("/")
+        entry = manifest.outputs.get(str(path))
+        if entry is not None and entry["kind"] == "asset":
+            depends.add(path)
+    return sorted(depends)
+
+
+def page_options():
+    """Returns the settings pages are built with, see BuildManifest.is_fresh."""
+    options = {}
+    if minify.minifying():
+        options["minify"] = True
+    if search.indexing():
+        # pages built without it were never added to the index
+        options["search"] = True
+    # static file references are rewritten with these maps
+    if fingerprint.active_assets() is not None:
+        options["fingerprint"] = True
+    if images.active_images() is not None:
+        options["images"] = True
+    return options or None
+
+
+def generate_page(
+    src: Path = Path("content/index.md"),
+    tmplt: Path = Path("template/template.html"),
+    dst: Path = Path("public/index.html"),
+    manifest: BuildManifest = None,
+):
+    metadata = read_header(src)
+    if metadata["draft"]:
+        print(f"✋ {src} (Skipped - draft)")
+        remove_draft(dst, manifest)
+        return False
+    tmplt = page_template(metadata, tmplt)
+    # skip pages whose source and template did not change since the last build
+    inputs = page_inputs(src, tmplt)
+    if manifest is not None and manifest.is_fresh(dst, inputs, page_options()):
+        print(f"⏩ {dst} (unchanged)")
+        return False
+
+    warnings, links, image_links, document = render_page(src, tmplt, dst, metadata)
+    if manifest is not None:
+        manifest.record(
+            dst,
+            inputs,
+            options=page_options(),
+            links=links,
+            depends=page_depends(dst, links, image_links, manifest),
+        )
+    index = search.active_index()
+    if index is not None:
+        index.add(dst, *document)
     # log success
     print(f"✅ {dst} (from '{src}' using '{tmplt}')")
+    for warning in warnings:
+        print(f"⚠️ {src}: {warning}")
+    return True
+
+
+def remove_draft(dst: Path, manifest: BuildManifest = None):
+    """Deletes the page built from a source that became a draft."""
+    if manifest is not None and str(dst) in manifest.outputs:
+        dst.unlink(missing_ok=True)
+        manifest.forget(dst)
+        print(f"🗑️ {dst} (Removed - draft)")
+
+
+def find_pages(src: Path = Path("content/"), dst: Path = Path("public/")):
+    """Finds all markdown pages below src and their destination below dst.
+
+    Returns
+    -------
+    list
+        list of tuples sorted by path: [(src_file, dst_file), ...]
+    """
+    pages = []
+
+    for src_file in sorted(src.iterdir()):
+        if not src_file.is_file():
+            pages.extend(find_pages(src_file, dst / src_file.stem))
+        elif src_file.suffix == ".md":
+            pages.append((src_file, dst / (src_file.stem + ".html")))
+        else:
+            print(f"✋ {src_file} (Skipped - Not a .md file)")
+
+    return pages
+
+
+# set in worker processes that send their profile back with each page
+_return_profile = False
+
+
+def _init_worker(
+    profile: bool,
+    cache: tuple = None,
+    assets=None,
+    image_map=None,
+    minified: bool = False,
+    indexed: bool = False,
+):
+    """Sets up a worker process like the main process.
+
+    cache are the (directory, max_bytes) of the parse cache, if enabled,
+    assets the AssetMap of fingerprinted static files and image_map the
+    ImageMap of image sizes, if enabled.
+    """
+    global _return_profile
+    if minified:
+        minify.enable_minify()
+    if indexed:
+        search.enable_search()
+    if cache is not None:
+        parse_cache.enable_cache(*cache)
+    if assets is not None:
+        fingerprint.enable_fingerprints(assets)
+    if image_map is not None:
+        images.enable_images(image_map)
+    if profile:
+        # forked workers inherit the parent's events, drop them
+        profiler.enable_profiling().take()
+        _return_profile = True
+
+
+def _render_page_job(page):
+    """Renders one (src, tmplt, dst, metadata) page.
+
+    Runs in worker processes, so errors are returned instead of raised.
+
+    Returns
+    -------
+    tuple
+        (error message or None, profile events or None, dict of counters,
+        what render_page returned or None)
+    """
+    src_file, tmplt_file, dst_file, metadata = page
+    error = result = None
+    try:
+        result = render_page(src_file, tmplt_file, dst_file, metadata)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    events = profiler.active_profiler().take() if _return_profile else None
+    cache = parse_cache.active_cache()
+    stats = cache.take_stats() if cache is not None else {}
+    stats.update(minify.take_stats())
+    stats.update(search.take_stats())
+    return error, events, stats, result
 
 
 def generate_pages_recursive(
     src: Path = Path("content/"),
     dst: Path = Path("public/"),
-    fil_c: int = 0,
+    manifest: BuildManifest = None,
+    jobs: int = 1,
+    tmplt: Path = Path("template/template.html"),
+    metadata: MetadataIndex = None,
+    explain: bool = False,
+    force: bool = False,
 ):
-    """Generates pages recursivly"""
-    if fil_c == 0:
-        print(f"\n\nGenerating pages from '{src}' to")
-        print("==================================")
+    """Generates pages recursivly
 
-    for src_file in list(src.iterdir()):
-        tmplt_file = Path("template/template.html")
+    All pages are discovered first and then rendered, across a pool of
+    jobs processes if jobs > 1. With a manifest, pages whose inputs are
+    unchanged are skipped, with explain it is logged why the others are
+    not. Failing pages don't stop the build. Drafts, found by their
+    header in metadata, are skipped. Pages can name their own template
+    in their front matter, tmplt is used otherwise. With force, all pages
+    are built again, but the manifest still knows their outputs.
 
-        if not src_file.is_file():
-            dst_file = dst / (src_file.stem + "/")
-            generate_pages_recursive(src_file, dst_file, fil_c)
+    Returns
+    -------
+    list
+        list of tuples of failed pages: [(src_file, error), ...]
+    """
+    print(f"\n\nGenerating pages from '{src}' to")
+    print("==================================")
 
-        elif src_file.is_file() and src_file.suffix == ".md":
-            dst_file = dst / (src_file.stem + ".html")
-            generate_page(src_file, tmplt_file, dst_file)
-            fil_c += 1
-        else:
-            print(f"✋ {src_file} (Skipped - Not a .md file)")
+    if metadata is None:
+        metadata = MetadataIndex(None)
+    read, reused = metadata.read, metadata.reused
+    errors = []
+    todo = []
+    # {dst_file: reasons it is built again}
+    reasons = {}
+    pages = find_pages(src, dst)
+    for src_file, dst_file in pages:
+        try:
+            page = metadata.get(src_file)
+            if page["draft"]:
+                print(f"✋ {src_file} (Skipped - draft)")
+                remove_draft(dst_file, manifest)
+                continue
+            page_tmplt = page_template(page, tmplt)
+            inputs = page_inputs(src_file, page_tmplt)
+        except (OSError, ValueError) as e:
+            # bad front matter or a template that is missing or broken
+            errors.append((src_file, f"{type(e).__name__}: {e}"))
+            print(f"❌ {dst_file} (from '{src_file}' failed)")
             continue
+        if manifest is None:
+            todo.append((src_file, page_tmplt, dst_file, page))
+            continue
+        reasons[dst_file] = manifest.explain(dst_file, inputs, page_options())
+        if force and not reasons[dst_file]:
+            reasons[dst_file] = ["all pages are built again"]
+        if reasons[dst_file]:
+            todo.append((src_file, page_tmplt, dst_file, page))
+        else:
+            print(f"⏩ {dst_file} (unchanged)")
+    metadata.prune(src_file for src_file, _ in pages)
+
+    if jobs > 1 and len(todo) > 1:
+        profile = profiler.active_profiler() is not None
+        cache = parse_cache.active_cache()
+        if cache is not None:
+            cache = (cache.directory, cache.max_bytes)
+        assets = fingerprint.active_assets()
+        image_map = images.active_images()
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(
+                profile,
+                cache,
+                assets,
+                image_map,
+                minify.minifying(),
+                search.indexing(),
+            ),
+        ) as pool:
+            chunksize = max(1, len(todo) // (jobs * 4))
+            results = list(pool.map(_render_page_job, todo, chunksize=chunksize))
+    else:
+        results = map(_render_page_job, todo)
+
+    # results come back in discovery order, so logs are deterministic
+    warnings = []
+    stats = Counter()
+    index = search.active_index()
+    for (src_file, tmplt_file, dst_file, _), job in zip(todo, results):
+        error, events, counters, result = job
+        stats.update(counters)
+        if events:
+            profiler.active_profiler().events.extend(events)
+        if error is None:
+            notes, links, image_links, document = result
+            warnings.extend((src_file, note) for note in notes)
+            if manifest is not None:
+                manifest.record(
+                    dst_file,
+                    page_inputs(src_file, tmplt_file),
+                    options=page_options(),
+                    links=links,
+                    depends=page_depends(dst_file, links, image_links, manifest),
+                )
+            if index is not None:
+                index.add(dst_file, *document)
+            print(f"✅ {dst_file} (from '{src_file}' using '{tmplt_file}')")
+            if explain:
+                for reason in reasons.get(dst_file, []):
+                    print(f"   ↳ {reason}")
+        else:
+            errors.append((src_file, error))
+            print(f"❌ {dst_file} (from '{src_file}' failed)")
+
+    print(
+        f"\n📇 Metadata: {metadata.read - read} header(s) read, "
+        f"{metadata.reused - reused} reused"
+    )
+    if "parse_cache_hits" in stats:
+        print(
+            f"💾 Parse cache: {stats['parse_cache_hits']} hit(s), "
+            f"{stats['parse_cache_misses']} miss(es)"
+        )
+        print(
+            f"💾 Block cache: {stats['block_cache_hits']} hit(s), "
+            f"{stats['block_cache_misses']} miss(es)"
+        )
+    if "minify_bytes_saved" in stats:
+        print(f"🪶 Minified pages: {stats['minify_bytes_saved']} bytes saved")
+    if "search_terms_ns" in stats:
+        print(f"🔎 Counted search terms in {stats['search_terms_ns'] / 1e6:.1f} ms")
+
+    if warnings:
+        print(f"\n{len(warnings)} warning(s):")
+        for src_file, warning in warnings:
+            print(f"⚠️ {src_file}: {warning}")
+
+    if errors:
+        print(f"\n{len(errors)} page(s) failed:")
+        for src_file, error in errors:
+            print(f"❌ {src_file}: {error}")
+
+    return errors
+
+
+def remove_stale_pages(manifest: BuildManifest):
+    """Deletes generated pages whose markdown source is gone."""
+    for dst_file, src_file in manifest.stale("page"):
+        dst_file.unlink(missing_ok=True)
+        manifest.forget(dst_file)
+        print(f"🗑️ {dst_file} (Removed - '{src_file}' is gone)")
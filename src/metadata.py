@@ -0,0 +1,159 @@
+import datetime
+import itertools
+import json
+import re
+from pathlib import Path
+
+# front matter is enclosed in lines of three dashes at the top of a page
+FENCE = "---"
+_H1 = re.compile(r"^\s*#\s+(.*)$")
+
+
+def _value(text: str):
+    """Converts a front matter value: quoted string, [list], true/false or text."""
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        items = text[1:-1].split(",")
+        return [_value(item.strip()) for item in items if item.strip()]
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    return text
+
+
+def read_front_matter(lines) -> tuple:
+    """Reads YAML-lite front matter from the start of lines, e.g. a file.
+
+    Supports "key: value" lines, [inline, lists], lists of "- item" lines
+    below a "key:" line, true/false and # comments. Keys are lowercased.
+    Lines after the front matter are not read.
+
+    Returns
+    -------
+    tuple
+        (dict of front matter, iterator of the lines after it)
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or first.rstrip() != FENCE:
+        return {}, itertools.chain([first] if first is not None else [], lines)
+
+    front_matter = {}
+    key = None
+    for number, line in enumerate(lines, start=2):
+        line = line.rstrip()
+        item = line.lstrip()
+        if line == FENCE:
+            return front_matter, lines
+        if not item or item.startswith("#"):
+            continue
+        if item.startswith("- ") and isinstance(front_matter.get(key), list):
+            front_matter[key].append(_value(item[2:].strip()))
+            continue
+        name, colon, value = line.partition(":")
+        if not colon or not name.strip() or name != name.lstrip():
+            raise ValueError(f"Front matter line {number}: expected 'key: value'")
+        key = name.strip().lower()
+        # an empty value starts a list of "- item" lines
+        front_matter[key] = _value(value.strip()) if value.strip() else []
+    raise ValueError(f"Front matter is not closed with '{FENCE}'")
+
+
+def split_front_matter(markdown: str) -> tuple:
+    """Returns (dict of front matter, markdown after it) of a page."""
+    if not markdown.startswith(FENCE):
+        return {}, markdown
+    front_matter, rest = read_front_matter(markdown.splitlines(keepends=True))
+    return front_matter, "".join(rest)
+
+
+def find_title(lines):
+    """Returns the text of the first H1 heading in lines or None."""
+    for line in lines:
+        match = _H1.match(line.removesuffix("\n"))
+        if match:
+            return match[1]
+    return None
+
+
+def read_header(path: Path) -> dict:
+    """Reads the metadata of a page, only up to its front matter and title.
+
+    Returns
+    -------
+    dict
+        front matter with title, date (YYYY-MM-DD or None), tags (list),
+        template (or None) and draft (bool) always set
+    """
+    with path.open() as f:
+        metadata, rest = read_front_matter(f)
+        if not metadata.get("title"):
+            metadata["title"] = find_title(rest)
+        elif not isinstance(metadata["title"], str):
+            metadata["title"] = str(metadata["title"])
+
+    tags = metadata.get("tags", [])
+    if not isinstance(tags, list):
+        tags = [tags]
+    metadata["tags"] = [str(tag) for tag in tags]
+    metadata["draft"] = metadata.get("draft") is True
+    metadata.setdefault("template", None)
+    date = metadata.get("date") or None
+    if date is not None:
+        try:
+            date = datetime.date.fromisoformat(str(date)).isoformat()
+        except ValueError:
+            raise ValueError(f"Front matter date '{date}' is not YYYY-MM-DD")
+    metadata["date"] = date
+    return metadata
+
+
+class MetadataIndex:
+    """Metadata of all pages, see read_header, kept between builds.
+
+    Headers are read again only when the size or mtime of a page
+    changed, so listings of the whole site need no page to be rendered.
+    Without a path the index is only kept in memory.
+    """
+
+    def __init__(self, path: Path = Path(".build/metadata.json")) -> None:
+        self.path = path
+        # {src path: [mtime_ns, size, metadata]}
+        self.pages = {}
+        self.read = 0
+        self.reused = 0
+
+        if path is not None and path.is_file():
+            try:
+                self.pages = json.loads(path.read_text())
+            except ValueError:
+                print(f"⚠️ Ignoring unreadable metadata index '{path}'")
+
+    def get(self, src: Path) -> dict:
+        """Returns the metadata of a page, reading its header if it changed."""
+        stat = src.stat()
+        cached = self.pages.get(str(src))
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self.reused += 1
+            return cached[2]
+
+        metadata = read_header(src)
+        self.pages[str(src)] = [stat.st_mtime_ns, stat.st_size, metadata]
+        self.read += 1
+        return metadata
+
+    def clear(self) -> None:
+        self.pages = {}
+
+    def prune(self, sources) -> None:
+        """Forgets all pages but sources, e.g. ones that were deleted."""
+        keep = {str(src) for src in sources}
+        self.pages = {src: entry for src, entry in self.pages.items() if src in keep}
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.pages))
+        tmp.replace(self.path)
@@ -0,0 +1,109 @@
+import re
+from collections import Counter
+from pathlib import Path
+
+# tags whose content is kept as it is, whitespace included
+_PROTECTED = "pre|code|textarea|script|style"
+# tags around which whitespace never shows, so it can be dropped
+_BLOCK = (
+    "!doctype|html|head|body|meta|link|title|article|section|header|footer|nav"
+    "|main|aside|div|p|h[1-6]|ul|ol|li|blockquote|pre|table|thead|tbody|tr|td|th"
+)
+_HTML_TOKENS = re.compile(
+    rf"(\s*)(<({_PROTECTED})\b.*?</\3\s*>)"
+    rf"|\s*(</?(?:{_BLOCK})\b[^>]*>)\s*"
+    r"|\s+",
+    flags=re.DOTALL | re.IGNORECASE,
+)
+_CSS_TOKENS = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+    r"|/\*.*?\*/"
+    r"|\s*;\s*(?=\})"
+    r"|\s*([{};,>])\s*"
+    r"|\s+",
+    flags=re.DOTALL,
+)
+
+
+def _html_token(match):
+    if match[2] is not None:
+        # whitespace before <code> is a space in the text, before <pre> not
+        block = match[3].lower() in ("pre", "script", "style")
+        space = " " if match[1] and not block else ""
+        return space + match[2]
+    if match[4] is not None:
+        return match[4]
+    return " "
+
+
+def minify_html(html: str) -> str:
+    """Collapses whitespace in HTML.
+
+    Runs of whitespace become a single space and whitespace around block
+    level tags is dropped. Content of <pre>, <code>, <textarea>, <script>
+    and <style> is kept as it is.
+    """
+    return _HTML_TOKENS.sub(_html_token, html).strip()
+
+
+def _css_token(match):
+    if match[1] is not None:
+        return match[1]
+    if match[2] is not None:
+        return match[2]
+    # comments and the last ";" of a block are dropped, whitespace collapsed
+    return "" if match[0].lstrip()[:1] in ("/", ";") else " "
+
+
+def minify_css(css: str) -> str:
+    """Removes comments and whitespace that doesn't matter from CSS.
+
+    Strings are kept as they are. Spaces around ":" are kept, as they
+    separate selectors like "a :hover".
+    """
+    return _CSS_TOKENS.sub(_css_token, css).strip()
+
+
+MINIFIERS = {".html": minify_html, ".css": minify_css}
+
+
+_active = False
+_stats = Counter()
+
+
+def enable_minify():
+    """Minifies pages and CSS written in this process, also used to set up
+    workers."""
+    global _active
+    _active = True
+
+
+def disable_minify():
+    global _active
+    _active = False
+
+
+def minifying() -> bool:
+    return _active
+
+
+def minify_text(text: str, suffix: str) -> str:
+    """Minifies the text of a .html or .css file and counts the bytes saved."""
+    minified = MINIFIERS[suffix](text)
+    _stats["minify_bytes_saved"] += len(text.encode()) - len(minified.encode())
+    return minified
+
+
+def minify_file(src_file: Path, dst_file: Path) -> None:
+    """Writes a minified copy of src_file to dst_file."""
+    text = minify_text(src_file.read_text(), src_file.suffix)
+    # dst_file may be a hardlink of the source, so never write into it
+    dst_file.unlink(missing_ok=True)
+    dst_file.write_text(text)
+
+
+def take_stats() -> dict:
+    """Returns and resets the bytes saved in this process."""
+    stats = dict(_stats)
+    _stats.clear()
+    return stats
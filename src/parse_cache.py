@@ -0,0 +1,250 @@
+import os
+import time
+import hashlib
+import sqlite3
+from pathlib import Path
+
+import block_markdown
+import htmlnode
+import inline_markdown
+import textnode
+
+
+def parser_version() -> str:
+    """Returns a hash of the parser's source, so cached HTML of an older
+    parser is never reused."""
+    digest = hashlib.sha256()
+    for module in (block_markdown, inline_markdown, htmlnode, textnode):
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class BlockCache:
+    """Cache of rendered block HTML keyed by a hash of the block's text.
+
+    Lookups go to memory first, so blocks repeated within a page are
+    converted once, then to an SQLite file that persists across builds.
+    New entries and uses are written in one transaction by flush(), which
+    also empties the memory, so it only ever holds the blocks of a page.
+    """
+
+    def __init__(self, path: Path, version: str, max_bytes: int) -> None:
+        self.path = path
+        self.version = version.encode()
+        self.max_bytes = max_bytes
+        # entries are marked with the build they were last used in
+        self.build = time.time_ns()
+        self.memory = {}
+        self.pending = {}
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+
+    @property
+    def db(self):
+        # opened lazily, so only processes that render pages connect
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=60)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blocks "
+                "(key BLOB PRIMARY KEY, html TEXT NOT NULL, used INTEGER NOT NULL)"
+            )
+        return self._db
+
+    def key(self, lines: list) -> bytes:
+        return hashlib.sha256(self.version + "\n".join(lines).encode()).digest()
+
+    def get(self, lines: list):
+        """Returns the cached HTML of a block given as lines or None."""
+        key = self.key(lines)
+        html = self.memory.get(key)
+        if html is None:
+            row = self.db.execute(
+                "SELECT html FROM blocks WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            html = self.memory[key] = row[0]
+            self.used.add(key)
+        self.hits += 1
+        return html
+
+    def put(self, lines: list, html: str) -> None:
+        key = self.key(lines)
+        self.memory[key] = self.pending[key] = html
+
+    def flush(self) -> None:
+        """Writes new entries and marks used ones in the database."""
+        self.memory = {}
+        if not self.pending and not self.used:
+            return
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)",
+                ((key, html, self.build) for key, html in self.pending.items()),
+            )
+            self.db.executemany(
+                "UPDATE blocks SET used = ? WHERE key = ?",
+                ((self.build, key) for key in self.used),
+            )
+        self.pending = {}
+        self.used = set()
+
+    def entries(self) -> list:
+        """Returns all entries, after writing pending ones.
+
+        Returns
+        -------
+        list
+            list of tuples: [(last use in ns, size, key), ...]
+        """
+        self.flush()
+        return self.db.execute("SELECT used, length(html), key FROM blocks").fetchall()
+
+    def delete(self, keys: list) -> None:
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM blocks WHERE key = ?", ((key,) for key in keys)
+            )
+
+    def evict(self) -> int:
+        """Deletes least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        deleted = []
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            deleted.append(key)
+            total -= size
+        self.delete(deleted)
+        return len(deleted)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+
+class ParseCache:
+    """On-disk cache of rendered content HTML keyed by markdown hash.
+
+    Entries are files named by the hash of the parser version and the
+    markdown. Hits touch their file, so evict() can drop the least
+    recently used entries once the cache grows beyond max_bytes.
+    Pages that miss are converted with the BlockCache in blocks, so
+    only their changed blocks are converted again. Its entries count
+    towards the same max_bytes.
+    """
+
+    def __init__(
+        self,
+        directory: Path = Path(".build/parse_cache"),
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = parser_version()
+        self.blocks = BlockCache(directory / "blocks.sqlite", self.version, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, markdown: str) -> Path:
+        key = hashlib.sha256(f"{self.version}\n{markdown}".encode()).hexdigest()
+        return self.directory / key[:2] / f"{key}.html"
+
+    def get(self, markdown: str):
+        """Returns the cached HTML of markdown or None."""
+        path = self.path(markdown)
+        try:
+            html = path.read_text()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # mtime marks the last use for evict()
+        os.utime(path)
+        self.hits += 1
+        return html
+
+    def put(self, markdown: str, html: str) -> None:
+        path = self.path(markdown)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write and rename, so parallel workers never read half an entry
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(html)
+        tmp.replace(path)
+
+    def take_stats(self) -> dict:
+        """Returns and resets the hit and miss counters."""
+        stats = {
+            "parse_cache_hits": self.hits,
+            "parse_cache_misses": self.misses,
+            "block_cache_hits": self.blocks.hits,
+            "block_cache_misses": self.blocks.misses,
+        }
+        self.hits = self.misses = self.blocks.hits = self.blocks.misses = 0
+        return stats
+
+    def evict(self) -> int:
+        """Deletes least recently used pages and blocks until both together
+        fit max_bytes.
+
+        Returns
+        -------
+        int
+            number of deleted entries
+        """
+        # pages by mtime and blocks by build, both in ns since the epoch
+        entries = [(used, size, key, True) for used, size, key in self.blocks.entries()]
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".html"):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path, False))
+        total = sum(entry[1] for entry in entries)
+
+        blocks = []
+        deleted = 0
+        for _, size, key, is_block in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if is_block:
+                blocks.append(key)
+            else:
+                os.remove(key)
+            total -= size
+            deleted += 1
+        self.blocks.delete(blocks)
+        return deleted
+
+
+_active = None
+
+
+def enable_cache(
+    directory: Path = Path(".build/parse_cache"),
+    max_bytes: int = 256 * 1024 * 1024,
+) -> ParseCache:
+    """Turns on the parse cache in this process, also used to set up workers."""
+    global _active
+    _active = ParseCache(directory, max_bytes)
+    return _active
+
+
+def disable_cache():
+    global _active
+    if _active is not None:
+        _active.blocks.close()
+    _active = None
+
+
+def active_cache():
+    """Returns the ParseCache in use or None."""
+    return _active
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import threading
+import functools
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+
+import block_markdown
+import inline_markdown
+import markdown_to_html
+import metadata
+from templates import Template
+
+
+class Profiler:
+    """Records the wall time of build phases and pages as trace events.
+
+    install() wraps the functions of the markdown pipeline with timers.
+    Nothing is wrapped unless profiling is enabled, so a normal build
+    runs the plain functions.
+    """
+
+    def __init__(self) -> None:
+        self.events = []
+        self.page = None
+        self._patched = []
+
+    def record(self, name, start, end, page=None):
+        self.events.append(
+            {
+                "name": name,
+                "ph": "X",
+                # trace events use microseconds
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {"page": page or self.page},
+            }
+        )
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns())
+
+    def wrap(self, owner, attr, name, page_arg=False):
+        """Replaces owner.attr with a timed version.
+
+        With page_arg, the first argument is the page every event
+        recorded during the call belongs to.
+        """
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            if page_arg:
+                self.page = f"{args[0]}"
+            start = time.perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter_ns())
+                if page_arg:
+                    self.page = None
+
+        setattr(owner, attr, timed)
+        self._patched.append((owner, attr, original))
+
+    def install(self):
+        self.wrap(markdown_to_html, "render_page", "page", page_arg=True)
+        self.wrap(metadata, "read_header", "read_header")
+        self.wrap(markdown_to_html, "markdown_to_html_node", "markdown_to_html_node")
+        self.wrap(block_markdown, "lines_to_block_type", "lines_to_block_type")
+        self.wrap(
+            block_markdown, "block_lines_to_html_node", "block_lines_to_html_node"
+        )
+        self.wrap(inline_markdown, "text_to_textnodes", "text_to_textnodes")
+        self.wrap(Template, "render", "template render (to_html + write)")
+
+    def uninstall(self):
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+        self._patched = []
+
+    def take(self) -> list:
+        """Returns and forgets the recorded events."""
+        events, self.events = self.events, []
+        return events
+
+    def report(self, top: int = 10):
+        """Prints phase totals and the top slowest pages."""
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event["name"], [0, 0])
+            total[0] += event["dur"]
+            total[1] += 1
+
+        print("\n\nProfile")
+        print("==================================")
+        print(f"{'phase':<40}{'total ms':>12}{'calls':>10}")
+        for name, (duration, calls) in sorted(totals.items(), key=lambda t: -t[1][0]):
+            print(f"{name:<40}{duration / 1000:>12.1f}{calls:>10}")
+
+        pages = sorted(
+            (event for event in self.events if event["name"] == "page"),
+            key=lambda event: -event["dur"],
+        )
+        print(f"\n{'slowest pages':<40}{'ms':>12}")
+        for event in pages[:top]:
+            print(f"{event['args']['page']:<40}{event['dur'] / 1000:>12.1f}")
+
+    def write_trace(self, path: Path = Path(".build/profile.json")):
+        """Writes a Trace Event file, e.g. for chrome://tracing or Perfetto."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": self.events}))
+        print(f"\n📈 Trace written to '{path}'")
+
+
+_active = None
+
+
+def enable_profiling() -> Profiler:
+    """Starts profiling in this process, also used to set up worker processes."""
+    global _active
+    if _active is None:
+        _active = Profiler()
+        _active.install()
+    return _active
+
+
+def disable_profiling():
+    global _active
+    if _active is not None:
+        _active.uninstall()
+        _active = None
+
+
+def active_profiler():
+    """Returns the running Profiler or None."""
+    return _active
+
+
+def phase(name):
+    """Times a block as a build phase if profiling, otherwise does nothing."""
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name)
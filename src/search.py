@@ -0,0 +1,276 @@
+import heapq
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from linkcheck import page_url
+from manifest import BuildManifest
+from metadata import read_front_matter
+
+# words of the page text, link targets are not part of it
+_WORD = re.compile(r"\w\w+")
+_LINK_TARGET = re.compile(r"\]\([^)]*\)")
+# shards hold all terms starting with the same PREFIX characters
+PREFIX = 2
+
+
+def page_terms(lines) -> dict:
+    """Counts the words of a markdown page given as lines, e.g. a file.
+
+    Returns
+    -------
+    dict
+        {lowercase term: number of occurrences}
+    """
+    terms = Counter()
+    for line in lines:
+        terms.update(_WORD.findall(_LINK_TARGET.sub("]", line).lower()))
+    return dict(terms)
+
+
+def shard_name(term: str) -> str:
+    """Returns the shard of a term, its prefix with other than a-z0-9 escaped."""
+    return "".join(
+        char if char.isascii() and char.isalnum() else f"_{ord(char):x}"
+        for char in term[:PREFIX]
+    )
+
+
+def encode_postings(postings: dict) -> list:
+    """Encodes {doc id: count} as [id gap, count, id gap, count, ...].
+
+    Ids are sorted and stored as the gap to the previous id, which keeps
+    the numbers small.
+    """
+    encoded = []
+    previous = 0
+    for doc in sorted(postings):
+        encoded += [doc - previous, postings[doc]]
+        previous = doc
+    return encoded
+
+
+def decode_postings(encoded: list) -> dict:
+    postings = {}
+    doc = 0
+    for i in range(0, len(encoded), 2):
+        doc += encoded[i]
+        postings[doc] = encoded[i + 1]
+    return postings
+
+
+class SearchIndex:
+    """Inverted index of the page text, written as static JSON files.
+
+    dst/docs.json lists [url, title] by doc id, dst/terms/<shard>.json
+    maps the terms of a shard to their encoded postings. Only shards
+    with terms of added, changed or removed pages are written again.
+    Doc ids and the shards of every page are kept in state. Ids of
+    removed pages are given to new pages, so docs.json does not grow
+    with holes.
+    """
+
+    def __init__(
+        self,
+        root: Path = Path("public/"),
+        dst: Path = Path("public/search"),
+        state: Path = Path(".build/search.json"),
+    ) -> None:
+        self.root = root
+        self.dst = dst
+        self.state = state
+        # {page url: [doc id, title, [shards]]}
+        self.pages = {}
+        self.next_id = 0
+        # {shard: {doc id: {term: count}}} of added or changed pages
+        self.added = {}
+        # ids of added, changed or removed pages
+        self.changed = set()
+        # shards these pages have or had terms in
+        self.dirty = set()
+        # shards in dst are of unknown pages and are rewritten from scratch
+        self.replace = True
+
+        if state.is_file() and (dst / "docs.json").is_file():
+            try:
+                data = json.loads(state.read_text())
+                self.pages = data["pages"]
+                self.next_id = data["next_id"]
+                self.replace = False
+            except (ValueError, KeyError):
+                print(f"⚠️ Ignoring unreadable search index state '{state}'")
+        if self.replace:
+            # e.g. left in a generation that was rolled back to
+            self.dirty = {path.stem for path in (dst / "terms").glob("*.json")}
+        # ids below next_id that no page has, smallest first
+        self.free = self._free_ids()
+
+    def _free_ids(self) -> list:
+        used = {page[0] for page in self.pages.values()}
+        return [doc for doc in range(self.next_id) if doc not in used]
+
+    def is_empty(self) -> bool:
+        return not self.pages
+
+    def add(self, dst_file: Path, title: str, terms: dict) -> None:
+        """Adds or replaces the document of the page written to dst_file."""
+        url = page_url(dst_file, self.root)
+        old = self.pages.get(url)
+        if old is not None:
+            doc = old[0]
+            self.dirty.update(old[2])
+        elif self.free:
+            # a free id has no postings left, or only in the shards of a
+            # page removed since the last write, which are dirty
+            doc = heapq.heappop(self.free)
+        else:
+            doc = self.next_id
+            self.next_id += 1
+        self.changed.add(doc)
+
+        shards = {}
+        for term, count in terms.items():
+            shards.setdefault(shard_name(term), {})[term] = count
+        for shard, shard_terms in shards.items():
+            self.added.setdefault(shard, {})[doc] = shard_terms
+        self.dirty.update(shards)
+        self.pages[url] = [doc, title, sorted(shards)]
+
+    def remove(self, url: str) -> None:
+        old = self.pages.pop(url, None)
+        if old is not None:
+            self.changed.add(old[0])
+            self.dirty.update(old[2])
+            # terms added since the last write must not go to the next page
+            # of this id
+            for shard in old[2]:
+                self.added.get(shard, {}).pop(old[0], None)
+            heapq.heappush(self.free, old[0])
+
+    def sync(self, manifest: BuildManifest) -> None:
+        """Removes the documents of pages that are not in the manifest anymore."""
+        urls = {
+            page_url(Path(output), self.root)
+            for output, entry in manifest.outputs.items()
+            if entry["kind"] == "page"
+        }
+        for url in list(self.pages):
+            if url not in urls:
+                self.remove(url)
+
+    def _write_shard(self, shard: str):
+        path = self.dst / "terms" / f"{shard}.json"
+        postings = {}
+        if path.is_file() and not self.replace:
+            postings = {
+                term: decode_postings(encoded)
+                for term, encoded in json.loads(path.read_text()).items()
+            }
+
+        # drop every page that was changed or removed ...
+        for term in list(postings):
+            docs = postings[term]
+            for doc in self.changed.intersection(docs):
+                del docs[doc]
+            if not docs:
+                del postings[term]
+        # ... and add the terms of added and changed pages
+        for doc, terms in self.added.get(shard, {}).items():
+            for term, count in terms.items():
+                postings.setdefault(term, {})[doc] = count
+
+        if not postings:
+            path.unlink(missing_ok=True)
+            return 0
+        text = json.dumps(
+            {term: encode_postings(postings[term]) for term in sorted(postings)},
+            separators=(",", ":"),
+        )
+        path.unlink(missing_ok=True)
+        path.write_text(text)
+        return len(text)
+
+    def write(self) -> None:
+        """Writes the changed shards, docs.json and the state."""
+        print("\n\nWriting search index")
+        print("==================================")
+
+        (self.dst / "terms").mkdir(parents=True, exist_ok=True)
+        total = 0
+        for shard in sorted(self.dirty):
+            start = time.perf_counter()
+            size = self._write_shard(shard)
+            duration = (time.perf_counter() - start) * 1000
+            total += size
+            print(f"🔎 {shard}.json ({size} bytes, {duration:.1f} ms)")
+
+        # ids after the last page are free -> drop them from the end
+        self.next_id = max((page[0] for page in self.pages.values()), default=-1) + 1
+        self.free = self._free_ids()
+        docs = [None] * self.next_id
+        for url, (doc, title, _) in self.pages.items():
+            docs[doc] = [url, title]
+        (self.dst / "docs.json").unlink(missing_ok=True)
+        (self.dst / "docs.json").write_text(json.dumps(docs, separators=(",", ":")))
+        self.state.parent.mkdir(parents=True, exist_ok=True)
+        self.state.write_text(
+            json.dumps({"pages": self.pages, "next_id": self.next_id})
+        )
+
+        print(
+            f"🔎 {len(self.dirty)} shard(s) written ({total} bytes), "
+            f"{len(self.pages)} page(s) indexed"
+        )
+        self.added = {}
+        self.changed = set()
+        self.dirty = set()
+        self.replace = False
+
+
+_indexing = False
+_index = None
+_stats = Counter()
+
+
+def enable_search(index: SearchIndex = None):
+    """Makes pages rendered in this process count their terms, also used to
+    set up workers, which leave index to the main process."""
+    global _indexing, _index
+    _indexing = True
+    _index = index
+
+
+def disable_search():
+    global _indexing, _index
+    _indexing = False
+    _index = None
+
+
+def indexing() -> bool:
+    return _indexing
+
+
+def active_index():
+    """Returns the SearchIndex pages are added to or None."""
+    return _index
+
+
+def count_terms(src: Path) -> dict:
+    """Counts the terms of a markdown file, without its front matter, and
+    the time it takes."""
+    start = time.perf_counter_ns()
+    with src.open() as f:
+        _, lines = read_front_matter(f)
+        terms = page_terms(lines)
+    _stats["search_terms_ns"] += time.perf_counter_ns() - start
+    return terms
+
+
+def take_stats() -> dict:
+    """Returns and resets the time spent counting terms in this process."""
+    stats = dict(_stats)
+    _stats.clear()
+    return stats
+
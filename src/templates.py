@@ -0,0 +1,112 @@
+import re
+from pathlib import Path
+
+# {{ Name }} placeholders in templates
+_SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# {{> partial.html }} is replaced by the partial
+_PARTIAL = re.compile(r"\{\{>\s*([^\s}]+)\s*\}\}")
+# {{< base.html }} at the start puts the rest into the Content slot of base
+_LAYOUT = re.compile(r"\s*\{\{<\s*([^\s}]+)\s*\}\}\s*")
+_CONTENT = re.compile(r"\{\{\s*Content\s*\}\}")
+
+
+class Template:
+    """A template split once into literal segments and named slots.
+
+    Rendering only writes the segments and slot values one after another,
+    so adding more slots costs nothing per page.
+    """
+
+    def __init__(self, text: str, files: list = ()) -> None:
+        # files the template was read from: itself, its layouts and partials
+        self.files = list(files)
+        # list of tuples: [(literal, slot name or None, placeholder), ...]
+        self.segments = []
+        start = 0
+        for match in _SLOT.finditer(text):
+            self.segments.append((text[start : match.start()], match[1], match[0]))
+            start = match.end()
+        self.segments.append((text[start:], None, ""))
+
+    @property
+    def slots(self) -> set:
+        return {name for _, name, _ in self.segments if name is not None}
+
+    def render(self, stream, **values) -> None:
+        """Writes the template with its slots filled into a stream.
+
+        Values can be strings or HTMLNodes, which are streamed with
+        write_html. Slots without a value are left as they are.
+        """
+        for literal, name, placeholder in self.segments:
+            stream.write(literal)
+            if name is None:
+                continue
+            value = values.get(name)
+            if value is None:
+                stream.write(placeholder)
+            elif hasattr(value, "write_html"):
+                value.write_html(stream)
+            else:
+                stream.write(f"{value}")
+
+
+def expand_template(path: Path, including: tuple = ()) -> tuple:
+    """Reads a template with its layout and partials filled in.
+
+    Names of layouts and partials are relative to the directory of the
+    template that uses them.
+
+    Returns
+    -------
+    tuple
+        (text, list of the files read)
+    """
+    if path in including:
+        raise ValueError(f"Template '{path}' includes itself")
+    including += (path,)
+    text = path.read_text()
+    files = [path]
+
+    def include(match):
+        partial, partial_files = expand_template(path.parent / match[1], including)
+        files.extend(partial_files)
+        return partial
+
+    layout = _LAYOUT.match(text)
+    if layout is not None:
+        text = text[layout.end() :]
+    text = _PARTIAL.sub(include, text)
+    if layout is not None:
+        base_path = path.parent / layout[1]
+        base, base_files = expand_template(base_path, including)
+        files.extend(base_files)
+        slot = _CONTENT.search(base)
+        if slot is None:
+            raise ValueError(f"Layout '{base_path}' has no {{{{ Content }}}} slot")
+        text = base[: slot.start()] + text + base[slot.end() :]
+    return text, files
+
+
+def _mtimes(files: list):
+    try:
+        return [path.stat().st_mtime_ns for path in files]
+    except OSError:
+        return None
+
+
+# compiled templates by path: {path: (mtime_ns of its files, Template)}
+_cache = {}
+
+
+def load_template(path: Path = Path("template/template.html")) -> Template:
+    """Returns the compiled template at path, compiling it only if it or
+    one of its layouts and partials changed."""
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == _mtimes(cached[1].files):
+        return cached[1]
+
+    text, files = expand_template(path)
+    template = Template(text, dict.fromkeys(files))
+    _cache[path] = (_mtimes(template.files), template)
+    return template
@@ -22,6 +22,10 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode(None, None, None, None)
         self.assertEqual("", node.props_to_html())
 
+    def test_to_html_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "value").to_html()
+
     def test_repr(self):
         node = HTMLNode("a", "value", ["child1", "child2"], test_props)
         self.assertEqual(
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import ParentNode, LeafNode
@@ -33,5 +34,13 @@ class TestParentNode(unittest.TestCase):
             outer_node.to_html()
         )
 
+    def test_write_html(self):
+        node = ParentNode(
+            "p", [LeafNode("b", "Bold text"), LeafNode(None, "Normal text")]
+        )
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual("<p><b>Bold text</b>Normal text</p>", stream.getvalue())
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 from pathlib import Path
 
@@ -12,6 +13,7 @@ from block_markdown import (
     ordered_list_to_html_node,
     paragraph_to_html_node,
     markdown_to_html_node,
+    write_markdown_html,
 )
 from htmlnode import ParentNode, LeafNode
 
@@ -350,3 +352,32 @@ class TestMarkdownToHTMLNodes(unittest.TestCase):
         self.assertEqual(
             repr(result), repr(markdown_to_html_node(test_markdown_to_html_nodes))
         )
+
+
+class TestWriteMarkdownHTML(unittest.TestCase):
+
+    def stream(self, markdown):
+        stream = io.StringIO()
+        write_markdown_html(stream, io.StringIO(markdown))
+        return stream.getvalue()
+
+    def test_same_as_markdown_to_html_node(self):
+        for markdown in [
+            test_markdown_to_html_nodes,
+            "  # Heading  \n\n\n",
+            "\n\ntext\n  \nmore  \n \n\n  ",
+            "- one\n- two\n\n\n\n1. one\n2. two\n",
+        ]:
+            with self.subTest(markdown=markdown):
+                self.assertEqual(
+                    markdown_to_html_node(markdown).to_html(), self.stream(markdown)
+                )
+
+    def test_invalid_block(self):
+        with self.assertRaises(Exception):
+            self.stream("# Heading\n\n```\nnot closed")
+
+    def test_empty(self):
+        # same as markdown_to_html_node, an empty paragraph is invalid
+        with self.assertRaises(ValueError):
+            self.stream("\n \n")
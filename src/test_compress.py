@@ -0,0 +1,63 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from compress import compress_outputs
+from manifest import BuildManifest
+
+
+class TestCompressOutputs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.src = self.dir / "index.md"
+        self.src.write_text("# Home")
+        self.page = self.dir / "index.html"
+        self.page.write_text("<p>Hello</p>" * 200)
+        self.small = self.dir / "small.css"
+        self.small.write_text("body {}")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+        self.manifest.record(self.page, [self.src])
+        self.manifest.record(self.small, [self.small], kind="asset")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compress(self):
+        with redirect_stdout(io.StringIO()) as log:
+            compress_outputs(self.manifest)
+        return log.getvalue()
+
+    def test_compresses_large_files(self):
+        self.compress()
+        gz = self.dir / "index.html.gz"
+        self.assertEqual(self.page.read_bytes(), gzip.decompress(gz.read_bytes()))
+        self.assertFalse((self.dir / "small.css.gz").exists())
+
+    def test_reuses_unchanged(self):
+        self.compress()
+        self.assertIn("0 file(s) compressed", self.compress())
+
+    def test_reused_keeps_mtime(self):
+        self.compress()
+        # written again with the same content, e.g. by a full build
+        os.utime(self.page, ns=(0, self.page.stat().st_mtime_ns + 10**9))
+        self.assertIn("0 file(s) compressed", self.compress())
+        gz = self.dir / "index.html.gz"
+        self.assertEqual(self.page.stat().st_mtime_ns, gz.stat().st_mtime_ns)
+
+    def test_removes_stale(self):
+        self.compress()
+        self.page.unlink()
+        self.manifest.forget(self.page)
+        self.compress()
+        self.assertFalse((self.dir / "index.html.gz").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from fingerprint import AssetMap, fingerprint_assets, fingerprinted_name
+from manifest import BuildManifest
+
+
+class TestAssetMap(unittest.TestCase):
+
+    def setUp(self):
+        self.assets = AssetMap(
+            {
+                "/index.css": "/index.1234abcd.css",
+                "/images/logo.png": "/images/logo.5678ef90.png",
+            }
+        )
+
+    def test_fingerprinted_name(self):
+        self.assertEqual("index.3f2a1b9c.css", fingerprinted_name("index.css", "3f2a1b9c00"))
+        self.assertEqual("LICENSE.3f2a1b9c", fingerprinted_name("LICENSE", "3f2a1b9c00"))
+
+    def test_rewrite_absolute(self):
+        self.assertEqual(
+            '<link href="/index.1234abcd.css" rel="stylesheet">',
+            self.assets.rewrite('<link href="/index.css" rel="stylesheet">'),
+        )
+
+    def test_rewrite_relative(self):
+        self.assertEqual(
+            '<img src="../images/logo.5678ef90.png" alt="logo">',
+            self.assets.rewrite(
+                '<img src="../images/logo.png" alt="logo">', base="/blog/"
+            ),
+        )
+
+    def test_keeps_query_and_fragment(self):
+        self.assertEqual(
+            '<a href="/index.1234abcd.css?v=1#top">css</a>',
+            self.assets.rewrite('<a href="/index.css?v=1#top">css</a>'),
+        )
+
+    def test_ignores_other_references(self):
+        html = (
+            '<a href="https://example.com/index.css">x</a>'
+            '<a href="/about.html">about</a><p>href="/index.css"</p>'
+        )
+        self.assertEqual(html, self.assets.rewrite(html))
+
+    def test_writer(self):
+        stream = io.StringIO()
+        writer = self.assets.writer(stream, Path("public/blog/post.html"))
+        writer.write('<img src="../images/logo.png" alt="logo">')
+        self.assertEqual(
+            '<img src="../images/logo.5678ef90.png" alt="logo">', stream.getvalue()
+        )
+
+
+class TestFingerprintAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.static = self.dir / "static"
+        self.public = self.dir / "public"
+        self.static.mkdir()
+        self.public.mkdir()
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+        self.add("index.css", "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, name, text):
+        (self.static / name).write_text(text)
+        (self.public / name).write_text(text)
+        self.manifest.record(self.public / name, [self.static / name], kind="asset")
+
+    def fingerprint(self):
+        with redirect_stdout(io.StringIO()):
+            return fingerprint_assets(
+                self.manifest, self.public, self.public / "assets.json"
+            )
+
+    def test_writes_copies_and_map(self):
+        assets = self.fingerprint()
+        url = assets.urls["/index.css"]
+        self.assertEqual("body {}", (self.public / url[1:]).read_text())
+        self.assertEqual(
+            assets.urls, json.loads((self.public / "assets.json").read_text())
+        )
+
+    def test_removes_old_copies(self):
+        old = self.fingerprint().urls["/index.css"]
+        self.add("index.css", "body { color: red }")
+        new = self.fingerprint().urls["/index.css"]
+        self.assertNotEqual(old, new)
+        self.assertFalse((self.public / old[1:]).exists())
+        self.assertTrue((self.public / new[1:]).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from generations import (
+    current_generation,
+    generation_manifest,
+    list_generations,
+    prune_generations,
+    rollback,
+    stage_generation,
+    swap_generation,
+)
+from manifest import BuildManifest
+from markdown_to_html import generate_pages_recursive, remove_stale_pages
+
+
+class TestGenerations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.public = self.dir / "public"
+        self.root = self.dir / "generations"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stage(self, reuse=True):
+        with redirect_stdout(io.StringIO()):
+            return stage_generation(self.public, self.root, reuse)
+
+    def build(self, text):
+        """Builds a generation with index.html and swaps to it."""
+        staging = self.stage()
+        (staging / "index.html").unlink(missing_ok=True)
+        (staging / "index.html").write_text(text)
+        swap_generation(staging, self.public)
+        return staging
+
+    def test_adopts_directory(self):
+        self.public.mkdir()
+        (self.public / "index.html").write_text("old")
+        staging = self.stage()
+        self.assertTrue(self.public.is_symlink())
+        self.assertEqual(
+            ["0001", "0002"], [path.name for path in list_generations(self.root)]
+        )
+        self.assertEqual("old", (self.public / "index.html").read_text())
+        self.assertEqual(self.root / "0002", staging)
+
+    def test_staging_reuses_files(self):
+        first = self.build("first")
+        (first / "css").mkdir()
+        (first / "css" / "index.css").write_text("body {}")
+        staging = self.stage()
+        self.assertTrue((staging / "css").is_dir())
+        css = staging / "css" / "index.css"
+        self.assertTrue(css.samefile(first / "css" / "index.css"))
+        self.assertEqual([], os.listdir(self.stage(reuse=False)))
+
+    def test_swap(self):
+        first = self.build("first")
+        self.assertEqual(first, current_generation(self.public, self.root))
+        second = self.build("second")
+        self.assertEqual(second, current_generation(self.public, self.root))
+        self.assertEqual("second", (self.public / "index.html").read_text())
+        self.assertEqual("first", (first / "index.html").read_text())
+
+    def test_prune(self):
+        generations = [self.build(str(i)) for i in range(4)]
+        # left over from a failed build
+        unfinished = self.stage()
+        with redirect_stdout(io.StringIO()):
+            prune_generations(2, self.public, self.root)
+        self.assertEqual(generations[1:], list_generations(self.root))
+        self.assertFalse(unfinished.exists())
+
+    def test_rollback(self):
+        first = self.build("first")
+        second = self.build("second")
+        generation_manifest(second).write_text("{}")
+        self.assertEqual(first, rollback(self.public, self.root))
+        self.assertEqual("first", (self.public / "index.html").read_text())
+        self.assertEqual([first], list_generations(self.root))
+        self.assertFalse(generation_manifest(second).exists())
+        self.assertIsNone(rollback(self.public, self.root))
+
+
+class TestStagedPages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.public = self.dir / "public"
+        self.root = self.dir / "generations"
+        self.tmplt = self.dir / "template.html"
+        self.tmplt.write_text("{{ Content }}")
+        self.content.mkdir()
+        (self.content / "index.md").write_text("# Home\n\nold")
+        (self.content / "post.md").write_text("# Post\n\npost")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self):
+        with redirect_stdout(io.StringIO()) as log:
+            staging = stage_generation(self.public, self.root)
+            self.manifest.move(self.public, staging)
+            generate_pages_recursive(
+                self.content, staging, self.manifest, tmplt=self.tmplt
+            )
+            remove_stale_pages(self.manifest)
+            swap_generation(staging, self.public)
+            self.manifest.move(staging, self.public)
+            self.manifest.save()
+            generation_manifest(staging).write_text(self.manifest.path.read_text())
+        return staging, log.getvalue()
+
+    def test_changed_page_replaced(self):
+        first, _ = self.build()
+        (self.content / "index.md").write_text("# Home\n\nnew")
+        second, log = self.build()
+        self.assertIn("post.html (unchanged)", log)
+        self.assertIn("new", (self.public / "index.html").read_text())
+        # the previous generation still has the old page
+        self.assertIn("old", (first / "index.html").read_text())
+        self.assertTrue((second / "post.html").samefile(first / "post.html"))
+        self.assertIn(str(self.public / "index.html"), self.manifest.outputs)
+
+    def test_rollback_restores_manifest(self):
+        first, _ = self.build()
+        (self.content / "post.md").unlink()
+        self.build()
+        self.assertEqual(first, rollback(self.public, self.root))
+        # like main.rollback_site
+        self.manifest = BuildManifest(generation_manifest(first))
+        self.assertIn(str(self.public / "post.html"), self.manifest.outputs)
+        # the post comes back with the hardlinks of the first generation
+        self.build()
+        self.assertFalse((self.public / "post.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
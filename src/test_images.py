@@ -0,0 +1,143 @@
+import io
+import json
+import struct
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from images import ImageMap, image_sizes, read_image_size
+from manifest import BuildManifest
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + struct.pack(">II", 640, 480)
+GIF = b"GIF89a" + struct.pack("<HH", 16, 8) + b"\x00" * 20
+JPEG = (
+    b"\xff\xd8"
+    # APP0 segment that has to be skipped
+    + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 300, 400) + b"\x00" * 10
+)
+
+
+def webp(chunk, data):
+    return b"RIFF" + b"\x00" * 4 + b"WEBP" + chunk + b"\x00" * 4 + data
+
+
+class TestReadImageSize(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "image"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size(self, data):
+        self.path.write_bytes(data)
+        return read_image_size(self.path)
+
+    def test_png(self):
+        self.assertEqual((640, 480), self.size(PNG))
+
+    def test_gif(self):
+        self.assertEqual((16, 8), self.size(GIF))
+
+    def test_jpeg(self):
+        self.assertEqual((400, 300), self.size(JPEG))
+
+    def test_webp(self):
+        vp8 = b"\x00" * 6 + struct.pack("<HH", 120, 90)
+        self.assertEqual((120, 90), self.size(webp(b"VP8 ", vp8)))
+        bits = (120 - 1) | ((90 - 1) << 14)
+        vp8l = b"\x2f" + bits.to_bytes(4, "little")
+        self.assertEqual((120, 90), self.size(webp(b"VP8L", vp8l)))
+        vp8x = b"\x00" * 4 + (120 - 1).to_bytes(3, "little") + (90 - 1).to_bytes(
+            3, "little"
+        )
+        self.assertEqual((120, 90), self.size(webp(b"VP8X", vp8x)))
+
+    def test_unknown_or_broken(self):
+        self.assertIsNone(self.size(b"<svg></svg>"))
+        self.assertIsNone(self.size(JPEG[:24]))
+
+
+class TestImageMap(unittest.TestCase):
+
+    def setUp(self):
+        self.images = ImageMap(
+            {"/images/logo.png": [640, 480], "/images/unknown.png": None}
+        )
+
+    def test_local_image(self):
+        self.assertEqual(
+            '<img src="/images/logo.png" alt="logo" width="640" height="480"'
+            ' loading="lazy" decoding="async"></img>',
+            self.images.add_attributes('<img src="/images/logo.png" alt="logo"></img>'),
+        )
+
+    def test_relative_image(self):
+        self.assertIn(
+            'width="640"',
+            self.images.add_attributes('<img src="../images/logo.png">', "/blog/"),
+        )
+
+    def test_unknown_size_keeps_existing(self):
+        self.assertEqual(
+            '<img src="/images/unknown.png" loading="eager" decoding="async" />',
+            self.images.add_attributes(
+                '<img src="/images/unknown.png" loading="eager" />'
+            ),
+        )
+
+    def test_remote_and_missing(self):
+        warnings = []
+        html = '<img src="https://example.com/a.png"><img src="/images/gone.png">'
+        self.assertEqual(html, self.images.add_attributes(html, "/", warnings))
+        self.assertEqual(
+            [
+                "remote image 'https://example.com/a.png'",
+                "missing image '/images/gone.png'",
+            ],
+            warnings,
+        )
+
+
+class TestImageSizes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.public = self.dir / "public"
+        (self.public / "images").mkdir(parents=True)
+        self.src = self.dir / "logo.png"
+        self.src.write_bytes(PNG)
+        self.path = self.dir / "images.json"
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+        self.manifest.record(
+            self.public / "images" / "logo.png", [self.src], kind="asset"
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sizes_by_url(self):
+        images = image_sizes(self.manifest, self.public, self.path)
+        self.assertEqual({"/images/logo.png": [640, 480]}, images.sizes)
+
+    def test_cached_by_hash(self):
+        image_sizes(self.manifest, self.public, self.path)
+        data = json.loads(self.path.read_text())
+        data["hashes"][self.manifest.hash(self.src)] = [1, 2]
+        self.path.write_text(json.dumps(data))
+        images = image_sizes(self.manifest, self.public, self.path)
+        self.assertEqual([1, 2], images.sizes["/images/logo.png"])
+
+    def test_unreadable_cache(self):
+        self.path.write_text("[")
+        with redirect_stdout(io.StringIO()):
+            images = image_sizes(self.manifest, self.public, self.path)
+        self.assertEqual([640, 480], images.sizes["/images/logo.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import time
 import unittest
 
 from textnode import TextNode, TextType
@@ -31,6 +32,10 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
         text = text_node_to_html_node(TextNode("Italic text", TextType.ITALIC))
         self.assertEqual(repr(text), repr(LeafNode("i", "Italic text", None)))
 
+    def test_conversion_bold_italic(self):
+        text = text_node_to_html_node(TextNode("Both", TextType.BOLD_ITALIC))
+        self.assertEqual("<b><i>Both</i></b>", text.to_html())
+
     def test_conversion_code(self):
         text = text_node_to_html_node(TextNode("Some code", TextType.CODE))
         self.assertEqual(repr(text), repr(LeafNode("code", "Some code", None)))
@@ -226,6 +231,59 @@ class TestTextToTextNodes(unittest.TestCase):
         ]
         self.assertEqual(result, text_to_textnodes(text))
 
+    def test_nested_emphasis(self):
+        text = "**bold *both* bold** and ***all***"
+        result = [
+            TextNode("bold ", TextType.BOLD),
+            TextNode("both", TextType.BOLD_ITALIC),
+            TextNode(" bold", TextType.BOLD),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("all", TextType.BOLD_ITALIC),
+        ]
+        self.assertEqual(result, text_to_textnodes(text))
+
+    def test_code_is_literal(self):
+        text = "`a * b` and [not a link]"
+        result = [
+            TextNode("a * b", TextType.CODE),
+            TextNode(" and [not a link]", TextType.TEXT),
+        ]
+        self.assertEqual(result, text_to_textnodes(text))
+
+    def test_image_in_link(self):
+        # images are split before links, the brackets around stay text
+        text = "[![logo](logo.png)](https://x.org)"
+        result = [
+            TextNode("[", TextType.TEXT),
+            TextNode("logo", TextType.IMAGE, "logo.png"),
+            TextNode("](https://x.org)", TextType.TEXT),
+        ]
+        self.assertEqual(result, text_to_textnodes(text))
+        self.assertEqual(
+            [
+                TextNode("[(]", TextType.TEXT),
+                TextNode("i", TextType.IMAGE, "p"),
+            ],
+            text_to_textnodes("[(]![i](p)"),
+        )
+
+    def test_many_brackets(self):
+        # brackets without links used to be scanned to the end of the text
+        text = "a [b] c ![d] e " * 20000
+        started = time.perf_counter()
+        result = text_to_textnodes("[f](g)" + text)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(
+            [TextNode("f", TextType.LINK, "g"), TextNode(text, TextType.TEXT)],
+            result,
+        )
+
+    def test_unclosed_delimiter(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("This is **not closed")
+        with self.assertRaises(Exception):
+            text_to_textnodes("This is `not closed")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from linkcheck import check_links, collector, link_index, resolve
+from manifest import BuildManifest
+from markdown_to_html import generate_pages_recursive
+
+
+class TestResolve(unittest.TestCase):
+
+    def test_internal(self):
+        self.assertEqual("/about.html", resolve("/about.html", "/blog/post.html"))
+        self.assertEqual(
+            "/blog/other.html", resolve("other.html?x=1#top", "/blog/a.html")
+        )
+        self.assertEqual(
+            "/images/a b.png", resolve("../images/a%20b.png", "/blog/a.html")
+        )
+        self.assertEqual("/blog/index.html", resolve("/blog/", "/index.html"))
+
+    def test_external(self):
+        for link in ["https://example.com/", "//example.com/a", "mailto:a@b.c", "#top"]:
+            with self.subTest(link=link):
+                self.assertIsNone(resolve(link, "/index.html"))
+
+    def test_collector(self):
+        links = []
+        image_links = []
+        stream = io.StringIO()
+        writer = collector(stream, links, image_links)
+        writer.write('<a href="/a.html">a</a><img src="b.png" alt="">')
+        self.assertEqual(["/a.html", "b.png"], links)
+        self.assertEqual(["b.png"], image_links)
+        self.assertIn("<a href", stream.getvalue())
+
+
+class TestCheckLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.public = self.dir / "public"
+        self.tmplt = self.dir / "template.html"
+        self.tmplt.write_text("{{ Content }}")
+        (self.content / "blog").mkdir(parents=True)
+        (self.content / "index.md").write_text(
+            "# Home\n\n[post](/blog/post.html) [blog](/blog) [gone](/gone.html)"
+        )
+        (self.content / "blog" / "index.md").write_text("# Blog\n\n[home](../)")
+        (self.content / "blog" / "post.md").write_text(
+            "# Post\n\n![logo](../logo.png) [web](https://example.com)"
+        )
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self):
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content, self.public, self.manifest, tmplt=self.tmplt
+            )
+            return check_links(self.manifest, self.public)
+
+    def test_index(self):
+        self.check()
+        self.assertEqual(
+            {"/index.html", "/", "/blog/index.html", "/blog", "/blog/post.html"},
+            link_index(self.manifest, self.public),
+        )
+
+    def test_dead_links(self):
+        self.assertEqual(
+            [
+                (self.content / "blog" / "post.md", "../logo.png"),
+                (self.content / "index.md", "/gone.html"),
+            ],
+            sorted(self.check()),
+        )
+
+    def test_static_files_and_unchanged_pages(self):
+        (self.public / "logo.png").parent.mkdir(parents=True, exist_ok=True)
+        (self.public / "logo.png").write_bytes(b"png")
+        self.manifest.record(self.public / "logo.png", [self.tmplt], kind="asset")
+        self.check()
+        # links of pages skipped as unchanged are still checked
+        self.assertEqual([(self.content / "index.md", "/gone.html")], self.check())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from linkcheck import check_links
+from listings import generate_listings, listing_html, remove_stale_listings, tag_slug
+from manifest import BuildManifest
+from markdown_to_html import generate_pages_recursive
+from metadata import MetadataIndex
+
+
+class TestListingHTML(unittest.TestCase):
+
+    def test_tag_slug(self):
+        self.assertEqual("web-dev", tag_slug("Web Dev"))
+        self.assertEqual("c", tag_slug("C++"))
+
+    def test_pagination(self):
+        page = {"title": "A <b>", "date": "2024-05-01"}
+        html = listing_html([("/a.html", page)], 2, 3, [])
+        self.assertIn('<a href="/a.html">A &lt;b&gt;</a>', html)
+        self.assertIn('<time datetime="2024-05-01">2024-05-01</time>', html)
+        self.assertIn('<a href="index.html" rel="prev">', html)
+        self.assertIn('<a href="3.html" rel="next">', html)
+
+
+class TestGenerateListings(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.public = self.dir / "public"
+        self.tmplt = self.dir / "template.html"
+        self.tmplt.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.content.mkdir()
+        for day in range(1, 6):
+            tags = "[web, python]" if day % 2 else "[web]"
+            (self.content / f"post{day}.md").write_text(
+                f"---\ndate: 2024-05-0{day}\ntags: {tags}\n---\n# Post {day}"
+            )
+        (self.content / "draft.md").write_text("---\ndraft: true\n---\n# Draft")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+        self.metadata = MetadataIndex(None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self):
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content,
+                self.public,
+                self.manifest,
+                tmplt=self.tmplt,
+                metadata=self.metadata,
+            )
+            generate_listings(
+                self.metadata, self.manifest, self.public, self.tmplt, per_page=2
+            )
+
+    def test_listings(self):
+        self.generate()
+        first = (self.public / "pages" / "index.html").read_text()
+        self.assertIn("<title>All pages</title>", first)
+        self.assertLess(first.index("Post 5"), first.index("Post 4"))
+        self.assertNotIn("Draft", first)
+        self.assertIn("Post 1", (self.public / "pages" / "3.html").read_text())
+        self.assertFalse((self.public / "pages" / "4.html").exists())
+        self.assertTrue((self.public / "tags" / "python" / "2.html").is_file())
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual([], check_links(self.manifest, self.public))
+
+    def test_unchanged_listings(self):
+        self.generate()
+        listing = self.public / "tags" / "web" / "index.html"
+        os.utime(listing, ns=(0, 10**9))
+        self.generate()
+        self.assertEqual(10**9, listing.stat().st_mtime_ns)
+        # a new title changes the listing
+        (self.content / "post5.md").write_text(
+            "---\ndate: 2024-05-05\ntags: [web]\n---\n# New"
+        )
+        self.manifest.forget(self.public / "post5.html")
+        self.generate()
+        self.assertIn("New", listing.read_text())
+        os.utime(listing, ns=(0, 10**9))
+        self.tmplt.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        self.generate()
+        self.assertIn("<h1>Tagged 'web'</h1>", listing.read_text())
+
+    def test_stale_listings(self):
+        self.generate()
+        for day in (1, 3, 5):
+            (self.content / f"post{day}.md").unlink()
+            self.manifest.forget(self.public / f"post{day}.html")
+        self.generate()
+        self.assertFalse((self.public / "tags" / "python").exists())
+        self.assertFalse((self.public / "pages" / "2.html").exists())
+        with redirect_stdout(io.StringIO()):
+            remove_stale_listings(self.manifest)
+        self.assertFalse((self.public / "pages" / "index.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
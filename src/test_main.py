@@ -0,0 +1,85 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from main import copy_files, remove_stale_files
+from manifest import BuildManifest
+from minify import disable_minify, enable_minify
+
+
+class TestCopyFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.src = self.dir / "static"
+        self.dst = self.dir / "public"
+        (self.src / "images").mkdir(parents=True)
+        (self.src / "index.css").write_text("body {}")
+        (self.src / "images" / "logo.png").write_bytes(b"png")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def copy(self, **kwargs):
+        with redirect_stdout(io.StringIO()) as log:
+            copy_files(self.src, self.dst, manifest=self.manifest, **kwargs)
+        return log.getvalue()
+
+    def test_copies_all_files(self):
+        self.copy()
+        self.assertEqual("body {}", (self.dst / "index.css").read_text())
+        self.assertEqual(b"png", (self.dst / "images" / "logo.png").read_bytes())
+
+    def test_sync_skips_unchanged(self):
+        self.copy()
+        log = self.copy()
+        self.assertIn("index.css (unchanged)", log)
+        self.assertIn("logo.png (unchanged)", log)
+
+    def test_sync_copies_changed(self):
+        self.copy()
+        (self.src / "index.css").write_text("body { margin: 0 }")
+        log = self.copy(checksum=True)
+        self.assertNotIn("index.css (unchanged)", log)
+        self.assertEqual("body { margin: 0 }", (self.dst / "index.css").read_text())
+
+    def test_sync_keeps_other_files(self):
+        self.dst.mkdir()
+        (self.dst / "index.html").write_text("<p>page</p>")
+        self.copy()
+        self.assertTrue((self.dst / "index.html").is_file())
+
+    def test_remove_stale_files(self):
+        self.copy()
+        (self.src / "index.css").unlink()
+        with redirect_stdout(io.StringIO()):
+            remove_stale_files(self.manifest)
+        self.assertFalse((self.dst / "index.css").exists())
+        self.assertTrue((self.dst / "images" / "logo.png").exists())
+
+    def test_hardlink(self):
+        self.copy(hardlink=True)
+        self.assertTrue(os.path.samefile(self.src / "index.css", self.dst / "index.css"))
+
+
+    def test_minify_css(self):
+        (self.src / "index.css").write_text("body {\n  margin: 0;\n}\n")
+        self.copy(hardlink=True)
+        enable_minify()
+        try:
+            self.assertIn("index.css (minified)", self.copy(hardlink=True))
+            self.assertIn("index.css (unchanged)", self.copy(hardlink=True))
+        finally:
+            disable_minify()
+        self.assertEqual("body{margin: 0}", (self.dst / "index.css").read_text())
+        self.assertEqual(
+            "body {\n  margin: 0;\n}\n", (self.src / "index.css").read_text()
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from manifest import BuildManifest, file_hash
+
+
+class TestBuildManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.src = self.dir / "index.md"
+        self.src.write_text("# Hello")
+        self.dst = self.dir / "index.html"
+        self.dst.write_text("<h1>Hello</h1>")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unknown_output_not_fresh(self):
+        self.assertFalse(self.manifest.is_fresh(self.dst, [self.src]))
+
+    def test_recorded_output_fresh(self):
+        self.manifest.record(self.dst, [self.src])
+        self.assertTrue(self.manifest.is_fresh(self.dst, [self.src]))
+
+    def test_changed_input_not_fresh(self):
+        self.manifest.record(self.dst, [self.src])
+        self.src.write_text("# Hello World")
+        os.utime(self.src, ns=(0, 0))
+        self.assertFalse(self.manifest.is_fresh(self.dst, [self.src]))
+
+    def test_changed_options_not_fresh(self):
+        self.manifest.record(self.dst, [self.src], options={"minify": True})
+        self.assertTrue(self.manifest.is_fresh(self.dst, [self.src], {"minify": True}))
+        self.assertFalse(self.manifest.is_fresh(self.dst, [self.src]))
+
+    def test_missing_output_not_fresh(self):
+        self.manifest.record(self.dst, [self.src])
+        self.dst.unlink()
+        self.assertFalse(self.manifest.is_fresh(self.dst, [self.src]))
+
+    def test_save_and_load(self):
+        self.manifest.record(self.dst, [self.src])
+        self.manifest.save()
+        loaded = BuildManifest(self.dir / "manifest.json")
+        self.assertTrue(loaded.is_fresh(self.dst, [self.src]))
+        self.assertEqual(file_hash(self.src), loaded.hash(self.src))
+
+    def test_stale(self):
+        self.manifest.record(self.dst, [self.src])
+        self.assertEqual([], self.manifest.stale())
+        self.src.unlink()
+        self.assertEqual([(self.dst, self.src)], self.manifest.stale())
+
+    def test_explain(self):
+        self.assertEqual(["not built before"], self.manifest.explain(self.dst, []))
+        other = self.dir / "template.html"
+        other.write_text("{{ Content }}")
+        self.manifest.record(self.dst, [self.src, other])
+        self.src.write_text("# Hello World")
+        self.assertEqual(
+            [
+                "options changed (None -> {'minify': True})",
+                f"'{other}' is no longer an input",
+                f"'{self.src}' changed",
+            ],
+            self.manifest.explain(self.dst, [self.src], {"minify": True}),
+        )
+
+    def test_depends(self):
+        image = self.dir / "logo.png"
+        self.manifest.record(self.dst, [self.src], depends=[image])
+        self.assertTrue(self.manifest.is_fresh(self.dst, [self.src]))
+        image.write_bytes(b"png")
+        self.assertEqual(
+            [f"'{image}' appeared"], self.manifest.explain(self.dst, [self.src])
+        )
+        self.manifest.record(self.dst, [self.src], depends=[image])
+        image.write_bytes(b"png, changed")
+        self.assertFalse(self.manifest.is_fresh(self.dst, [self.src]))
+        image.unlink()
+        self.assertEqual(
+            [f"'{image}' is gone"], self.manifest.explain(self.dst, [self.src])
+        )
+
+    def test_move(self):
+        public = self.dir / "public"
+        staging = self.dir / "staging"
+        public.mkdir()
+        staging.mkdir()
+        (public / "index.css").write_text("body {}")
+        (staging / "index.css").write_text("body {}")
+        self.manifest.record(public / "index.css", [self.src], kind="asset")
+        self.manifest.record(public / "index.css.gz", [public / "index.css"])
+        self.manifest.move(public, staging)
+        self.assertEqual(
+            {str(staging / "index.css"), str(staging / "index.css.gz")},
+            set(self.manifest.outputs),
+        )
+        entry = self.manifest.outputs[str(staging / "index.css.gz")]
+        self.assertEqual(str(staging / "index.css"), entry["source"])
+        self.assertEqual([str(staging / "index.css")], list(entry["inputs"]))
+        self.assertEqual(
+            str(self.src), self.manifest.outputs[str(staging / "index.css")]["source"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
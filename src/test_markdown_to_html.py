@@ -1,5 +1,19 @@
+import io
+import tempfile
 import unittest
-from markdown_to_html import extract_title
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import markdown_to_html
+from fingerprint import AssetMap, disable_fingerprints, enable_fingerprints
+from manifest import BuildManifest
+from images import ImageMap, disable_images, enable_images
+from markdown_to_html import (
+    extract_title,
+    find_pages,
+    generate_pages_recursive,
+    page_depends,
+)
 
 class TestMarkdownToHTML(unittest.TestCase):
 
@@ -14,3 +28,204 @@ class TestMarkdownToHTML(unittest.TestCase):
         """
         result = "This is my h1 heading"
         self.assertEqual(result, extract_title(markdown))
+
+
+class TestGeneratePages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.public = self.dir / "public"
+        self.tmplt = self.dir / "template.html"
+        self.tmplt.write_text("<title>{{ Title }}</title>{{ Content }}")
+        (self.content / "blog").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "blog" / "post.md").write_text("# Post\n\nSome *text*")
+        (self.content / "blog" / "broken.md").write_text("No heading")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return generate_pages_recursive(
+                self.content, self.public, tmplt=self.tmplt, **kwargs
+            )
+
+    def test_find_pages(self):
+        self.assertEqual(
+            [
+                (self.content / "blog" / "broken.md", self.public / "blog" / "broken.html"),
+                (self.content / "blog" / "post.md", self.public / "blog" / "post.html"),
+                (self.content / "index.md", self.public / "index.html"),
+            ],
+            find_pages(self.content, self.public),
+        )
+
+    def test_errors_collected(self):
+        errors = self.generate()
+        self.assertEqual([self.content / "blog" / "broken.md"], [e[0] for e in errors])
+        self.assertEqual(
+            "<title>Post</title><div><h1>Post</h1><p>Some <i>text</i></p></div>",
+            (self.public / "blog" / "post.html").read_text(),
+        )
+
+    def test_parallel_matches_serial(self):
+        self.generate()
+        serial = (self.public / "blog" / "post.html").read_text()
+        (self.public / "blog" / "post.html").unlink()
+        errors = self.generate(jobs=2)
+        self.assertEqual(1, len(errors))
+        self.assertEqual(serial, (self.public / "blog" / "post.html").read_text())
+
+    def test_streamed_matches_read(self):
+        self.generate()
+        read = (self.public / "blog" / "post.html").read_text()
+        (self.public / "blog" / "post.html").unlink()
+        stream_size = markdown_to_html.STREAM_SIZE
+        markdown_to_html.STREAM_SIZE = 0
+        try:
+            errors = self.generate()
+        finally:
+            markdown_to_html.STREAM_SIZE = stream_size
+        self.assertEqual(1, len(errors))
+        self.assertEqual(read, (self.public / "blog" / "post.html").read_text())
+
+    def test_front_matter(self):
+        (self.content / "blog" / "post.md").write_text(
+            "---\ntitle: A post\ntags: [web]\n---\n# Post\n\nSome *text*"
+        )
+        expected = (
+            "<title>A post</title><div><h1>Post</h1><p>Some <i>text</i></p></div>"
+        )
+        self.generate()
+        self.assertEqual(expected, (self.public / "blog" / "post.html").read_text())
+        stream_size = markdown_to_html.STREAM_SIZE
+        markdown_to_html.STREAM_SIZE = 0
+        try:
+            self.generate()
+        finally:
+            markdown_to_html.STREAM_SIZE = stream_size
+        self.assertEqual(expected, (self.public / "blog" / "post.html").read_text())
+
+    def test_title_from_metadata(self):
+        # headers are read once, by the metadata index, not again per page
+        read_header = markdown_to_html.read_header
+        markdown_to_html.read_header = None
+        try:
+            errors = self.generate()
+        finally:
+            markdown_to_html.read_header = read_header
+        self.assertEqual(
+            "Exception: All pages need a single H1 heading", errors[0][1]
+        )
+        post = (self.public / "blog" / "post.html").read_text()
+        self.assertIn("<title>Post</title>", post)
+
+    def test_front_matter_error(self):
+        (self.content / "index.md").write_text("---\ntitle: Home\n# Home")
+        errors = self.generate()
+        self.assertIn((self.content / "index.md"), [e[0] for e in errors])
+        self.assertFalse((self.public / "index.html").exists())
+
+    def test_draft_skipped(self):
+        manifest = BuildManifest(self.dir / "manifest.json")
+        self.generate(manifest=manifest)
+        self.assertTrue((self.public / "index.html").is_file())
+        (self.content / "index.md").write_text("---\ndraft: true\n---\n# Home")
+        self.generate(manifest=manifest)
+        self.assertFalse((self.public / "index.html").exists())
+        self.assertNotIn(str(self.public / "index.html"), manifest.outputs)
+
+
+class TestPageTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.public = self.dir / "public"
+        self.templates = self.dir / "template"
+        self.tmplt = self.templates / "template.html"
+        self.nav = self.templates / "nav.html"
+        self.content.mkdir()
+        self.templates.mkdir()
+        self.tmplt.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.nav.write_text("<nav>Home</nav>")
+        (self.templates / "post.html").write_text(
+            "{{< template.html }}{{> nav.html }}<article>{{ Content }}</article>"
+        )
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "post.md").write_text("---\ntemplate: post.html\n---\n# Post")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, **kwargs):
+        with redirect_stdout(io.StringIO()) as log:
+            errors = generate_pages_recursive(
+                self.content, self.public, self.manifest, tmplt=self.tmplt, **kwargs
+            )
+        return errors, log.getvalue()
+
+    def test_page_template(self):
+        self.generate()
+        self.assertEqual(
+            "<title>Post</title><nav>Home</nav><article><div><h1>Post</h1></div>"
+            "</article>",
+            (self.public / "post.html").read_text(),
+        )
+        self.assertEqual(
+            "<title>Home</title><div><h1>Home</h1></div>",
+            (self.public / "index.html").read_text(),
+        )
+
+    def test_partial_rebuilds_its_pages(self):
+        self.generate()
+        self.nav.write_text("<nav>Start</nav>")
+        _, log = self.generate(explain=True)
+        self.assertIn(f"⏩ {self.public / 'index.html'} (unchanged)", log)
+        self.assertIn(f"✅ {self.public / 'post.html'}", log)
+        self.assertIn(f"↳ '{self.nav}' changed", log)
+
+    def test_missing_template(self):
+        (self.content / "post.md").write_text("---\ntemplate: gone.html\n---\n# Post")
+        errors, _ = self.generate()
+        self.assertEqual([self.content / "post.md"], [e[0] for e in errors])
+        self.assertTrue((self.public / "index.html").is_file())
+
+    def test_page_depends(self):
+        static = self.dir / "static"
+        static.mkdir()
+        for name in ("logo.png", "index.css"):
+            (static / name).write_text(name)
+            self.manifest.record(self.public / name, [static / name], kind="asset")
+        links = [
+            "../logo.png",
+            "/index.css",
+            "/post.html",
+            "/majesty",
+            "https://a.b/c.png",
+        ]
+        image_links = ["../logo.png", "/missing.png", "https://a.b/c.png"]
+        dst_file = self.public / "blog" / "post.html"
+        self.assertEqual([], page_depends(dst_file, links, image_links, self.manifest))
+        # only sizes of images are written into the page
+        enable_images(ImageMap({}, self.public))
+        try:
+            self.assertEqual(
+                [self.public / "logo.png"],
+                page_depends(dst_file, links, image_links, self.manifest),
+            )
+        finally:
+            disable_images()
+        enable_fingerprints(AssetMap({}, self.public))
+        try:
+            self.assertEqual(
+                [self.public / "index.css", self.public / "logo.png"],
+                page_depends(dst_file, links, image_links, self.manifest),
+            )
+        finally:
+            disable_fingerprints()
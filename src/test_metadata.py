@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from metadata import MetadataIndex, read_front_matter, read_header, split_front_matter
+
+
+class TestFrontMatter(unittest.TestCase):
+
+    def test_values(self):
+        front_matter, rest = read_front_matter(
+            [
+                "---\n",
+                "Title: 'A: post'\n",
+                "# a comment\n",
+                "tags: [web, python]\n",
+                "draft: true\n",
+                "authors:\n",
+                "  - Ann\n",
+                "  - Bo\n",
+                "---\n",
+                "# Post\n",
+            ]
+        )
+        self.assertEqual(
+            {
+                "title": "A: post",
+                "tags": ["web", "python"],
+                "draft": True,
+                "authors": ["Ann", "Bo"],
+            },
+            front_matter,
+        )
+        self.assertEqual(["# Post\n"], list(rest))
+
+    def test_no_front_matter(self):
+        front_matter, rest = read_front_matter(["# Post\n", "text\n"])
+        self.assertEqual({}, front_matter)
+        self.assertEqual(["# Post\n", "text\n"], list(rest))
+        self.assertEqual(({}, "# Post"), split_front_matter("# Post"))
+
+    def test_split(self):
+        self.assertEqual(
+            ({"title": "Post"}, "# Post\n\ntext"),
+            split_front_matter("---\ntitle: Post\n---\n# Post\n\ntext"),
+        )
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "not closed"):
+            read_front_matter(["---\n", "title: Post\n", "# Post\n"])
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            read_front_matter(["---\n", "just text\n", "---\n"])
+
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.page = self.dir / "post.md"
+        self.page.write_text("---\ndate: 2024-05-01\ntags: web\n---\n\n# Post\n\ntext")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_header(self):
+        self.assertEqual(
+            {
+                "title": "Post",
+                "date": "2024-05-01",
+                "tags": ["web"],
+                "template": None,
+                "draft": False,
+            },
+            read_header(self.page),
+        )
+
+    def test_invalid_date(self):
+        self.page.write_text("---\ndate: May 1st\n---\n# Post")
+        with self.assertRaisesRegex(ValueError, "YYYY-MM-DD"):
+            read_header(self.page)
+
+    def test_reused_until_changed(self):
+        index = MetadataIndex(self.dir / "metadata.json")
+        index.get(self.page)
+        index.save()
+
+        index = MetadataIndex(self.dir / "metadata.json")
+        self.assertEqual("Post", index.get(self.page)["title"])
+        self.assertEqual((0, 1), (index.read, index.reused))
+        self.page.write_text("---\ntitle: New\n---\n# Post")
+        os.utime(self.page, ns=(0, 0))
+        self.assertEqual("New", index.get(self.page)["title"])
+        self.assertEqual(1, index.read)
+
+    def test_prune(self):
+        index = MetadataIndex(None)
+        index.get(self.page)
+        index.prune([])
+        self.assertEqual({}, index.pages)
+
+    def test_unreadable(self):
+        (self.dir / "metadata.json").write_text("{")
+        with redirect_stdout(io.StringIO()):
+            index = MetadataIndex(self.dir / "metadata.json")
+        self.assertEqual({}, index.pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from minify import minify_css, minify_file, minify_html
+
+
+class TestMinifyHTML(unittest.TestCase):
+
+    def test_whitespace_between_blocks(self):
+        self.assertEqual(
+            "<html><head><title>Home</title></head><body><p>a b</p></body></html>",
+            minify_html(
+                "<html>\n  <head>\n    <title> Home </title>\n  </head>\n"
+                "  <body>\n    <p>a\n      b</p>\n  </body>\n</html>\n"
+            ),
+        )
+
+    def test_inline_whitespace_kept(self):
+        self.assertEqual(
+            "<p>a <b>bold</b> and <code>x  y</code></p>",
+            minify_html("<p>a   <b>bold</b>\n and  <code>x  y</code></p>"),
+        )
+
+    def test_pre_kept(self):
+        code = "<pre><code>def f():\n    return  1\n</code></pre>"
+        self.assertEqual(
+            f"<div>{code}<p>x</p></div>",
+            minify_html(f"<div>\n  {code}\n  <p>x</p>\n</div>"),
+        )
+
+
+class TestMinifyCSS(unittest.TestCase):
+
+    def test_minify(self):
+        self.assertEqual(
+            "body{margin: 0;color: red}a :hover,b>i{content: '  a ; } '}",
+            minify_css(
+                "/* page */\nbody {\n  margin: 0;\n  color: red;\n}\n"
+                "a :hover,\nb > i { content: '  a ; } '; }\n"
+            ),
+        )
+
+
+class TestMinifyFile(unittest.TestCase):
+
+    def test_hardlinked_source_untouched(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "index.css"
+            dst = Path(tmp) / "public.css"
+            src.write_text("body {\n  margin: 0;\n}\n")
+            dst.hardlink_to(src)
+            minify_file(src, dst)
+            self.assertEqual("body {\n  margin: 0;\n}\n", src.read_text())
+            self.assertEqual("body{margin: 0}", dst.read_text())
+
+
+if __name__ == "__main__":
+    unittest.main()
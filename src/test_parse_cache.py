@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from block_markdown import markdown_to_html_node
+from parse_cache import BlockCache, ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.cache = ParseCache(self.dir)
+
+    def tearDown(self):
+        self.cache.blocks.close()
+        self.tmp.cleanup()
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get("# Heading"))
+        stats = self.cache.take_stats()
+        self.assertEqual(0, stats["parse_cache_hits"])
+        self.assertEqual(1, stats["parse_cache_misses"])
+
+    def test_hit(self):
+        self.cache.put("# Heading", "<div><h1>Heading</h1></div>")
+        self.assertEqual("<div><h1>Heading</h1></div>", self.cache.get("# Heading"))
+        stats = self.cache.take_stats()
+        self.assertEqual(1, stats["parse_cache_hits"])
+        self.assertEqual(0, stats["parse_cache_misses"])
+
+    def test_other_parser_version(self):
+        self.cache.put("# Heading", "<div><h1>Heading</h1></div>")
+        self.cache.version = "older"
+        self.assertIsNone(self.cache.get("# Heading"))
+
+    def test_evict_least_recently_used(self):
+        self.cache.max_bytes = 10
+        self.cache.put("old", "0123456789")
+        self.cache.put("new", "0123456789")
+        os.utime(self.cache.path("old"), ns=(0, 0))
+        self.assertEqual(1, self.cache.evict())
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual("0123456789", self.cache.get("new"))
+
+    def test_evict_shares_max_bytes(self):
+        self.cache.max_bytes = 15
+        self.cache.put("old", "0123456789")
+        os.utime(self.cache.path("old"), ns=(0, 0))
+        self.cache.blocks.put(["new"], "0123456789")
+        self.assertEqual(1, self.cache.evict())
+        self.assertIsNone(self.cache.get("old"))
+        self.assertEqual("0123456789", self.cache.blocks.get(["new"]))
+
+    def test_evict_keeps_block_cache(self):
+        self.cache.max_bytes = 0
+        self.cache.blocks.max_bytes = 100
+        self.cache.blocks.put(["# Heading"], "<h1>Heading</h1>")
+        self.cache.blocks.flush()
+        self.cache.evict()
+        self.assertTrue(self.cache.blocks.path.exists())
+
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "blocks.sqlite"
+        self.cache = BlockCache(self.path, "v1", 1024)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def reopen(self, version="v1"):
+        self.cache.close()
+        self.cache = BlockCache(self.path, version, 1024)
+
+    def test_hit_after_flush(self):
+        self.assertIsNone(self.cache.get(["a", "b"]))
+        self.cache.put(["a", "b"], "<p>a b</p>")
+        self.cache.flush()
+        self.reopen()
+        self.assertEqual("<p>a b</p>", self.cache.get(["a", "b"]))
+        self.assertEqual((1, 0), (self.cache.hits, self.cache.misses))
+
+    def test_lines_are_the_key(self):
+        self.cache.put(["a", "b"], "<p>a b</p>")
+        self.assertIsNone(self.cache.get(["a b"]))
+
+    def test_other_parser_version(self):
+        self.cache.put(["a"], "<p>a</p>")
+        self.reopen("v2")
+        self.assertIsNone(self.cache.get(["a"]))
+
+    def test_evict_least_recently_used(self):
+        self.cache.max_bytes = 10
+        self.cache.put(["old"], "0123456789")
+        self.cache.flush()
+        self.reopen()
+        self.cache.max_bytes = 10
+        self.cache.build += 1
+        self.cache.put(["new"], "0123456789")
+        self.assertEqual(1, self.cache.evict())
+        self.reopen()
+        self.assertIsNone(self.cache.get(["old"]))
+        self.assertEqual("0123456789", self.cache.get(["new"]))
+
+    def test_flush_empties_memory(self):
+        self.cache.put(["a"], "<p>a</p>")
+        self.cache.flush()
+        self.assertEqual({}, self.cache.memory)
+        self.assertEqual("<p>a</p>", self.cache.get(["a"]))
+
+    def test_markdown_to_html_node(self):
+        markdown = "# Title\n\nSome **bold** text\n\n- one\n- two\n\nSome **bold** text"
+        expected = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(expected, markdown_to_html_node(markdown, self.cache).to_html())
+        # the repeated paragraph is converted once
+        self.assertEqual((1, 3), (self.cache.hits, self.cache.misses))
+        self.assertEqual(expected, markdown_to_html_node(markdown, self.cache).to_html())
+        self.assertEqual((5, 3), (self.cache.hits, self.cache.misses))
+
+
+if __name__ == "__main__":
+    unittest.main()
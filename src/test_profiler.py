@@ -0,0 +1,44 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import block_markdown
+import profiler
+from block_markdown import markdown_to_html_node
+
+
+class TestProfiler(unittest.TestCase):
+
+    def tearDown(self):
+        profiler.disable_profiling()
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(profiler.active_profiler())
+        self.assertFalse(hasattr(block_markdown.lines_to_block_type, "__wrapped__"))
+
+    def test_records_phases(self):
+        active = profiler.enable_profiling()
+        with profiler.phase("build"):
+            markdown_to_html_node("# Heading\n\nSome *text*")
+        names = [event["name"] for event in active.events]
+        self.assertIn("lines_to_block_type", names)
+        self.assertIn("text_to_textnodes", names)
+        self.assertEqual("build", names[-1])
+
+    def test_disable_restores_functions(self):
+        original = block_markdown.lines_to_block_type
+        profiler.enable_profiling()
+        self.assertIsNot(original, block_markdown.lines_to_block_type)
+        profiler.disable_profiling()
+        self.assertIs(original, block_markdown.lines_to_block_type)
+
+    def test_report(self):
+        active = profiler.enable_profiling()
+        markdown_to_html_node("# Heading")
+        with redirect_stdout(io.StringIO()) as log:
+            active.report()
+        self.assertIn("lines_to_block_type", log.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
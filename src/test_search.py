@@ -0,0 +1,222 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import search
+from manifest import BuildManifest
+from markdown_to_html import generate_pages_recursive, remove_stale_pages
+from search import (
+    SearchIndex,
+    decode_postings,
+    encode_postings,
+    page_terms,
+    shard_name,
+)
+
+
+class TestTerms(unittest.TestCase):
+
+    def test_page_terms(self):
+        self.assertEqual(
+            {"home": 2, "see": 1, "the": 1, "blog": 1, "über": 1},
+            page_terms(["# Home\n", "See [the blog](/blog/a.html) home, a über\n"]),
+        )
+
+    def test_shard_name(self):
+        self.assertEqual("bl", shard_name("blog"))
+        self.assertEqual("_fcb", shard_name("über"))
+
+    def test_postings_roundtrip(self):
+        postings = {7: 1, 2: 3, 40: 2}
+        self.assertEqual([2, 3, 5, 1, 33, 2], encode_postings(postings))
+        self.assertEqual(postings, decode_postings(encode_postings(postings)))
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.public = self.dir / "public"
+        self.state = self.dir / "search.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def index(self):
+        return SearchIndex(self.public, self.public / "search", self.state)
+
+    def write(self, index):
+        with redirect_stdout(io.StringIO()):
+            index.write()
+
+    def shard(self, name):
+        path = self.public / "search" / "terms" / f"{name}.json"
+        if not path.is_file():
+            return None
+        return {
+            term: decode_postings(encoded)
+            for term, encoded in json.loads(path.read_text()).items()
+        }
+
+    def test_write(self):
+        index = self.index()
+        self.assertTrue(index.is_empty())
+        index.add(self.public / "a.html", "A", {"apple": 2, "banana": 1})
+        index.add(self.public / "b.html", "B", {"apple": 1})
+        self.write(index)
+        self.assertEqual({"apple": {0: 2, 1: 1}}, self.shard("ap"))
+        self.assertEqual({"banana": {0: 1}}, self.shard("ba"))
+        self.assertEqual(
+            [["/a.html", "A"], ["/b.html", "B"]],
+            json.loads((self.public / "search" / "docs.json").read_text()),
+        )
+
+    def test_update_writes_dirty_shards(self):
+        index = self.index()
+        index.add(self.public / "a.html", "A", {"apple": 2, "banana": 1})
+        index.add(self.public / "b.html", "B", {"cherry": 1})
+        self.write(index)
+        cherry = self.public / "search" / "terms" / "ch.json"
+        cherry.write_text('{"cherry":[1,5]}')
+
+        index = self.index()
+        self.assertFalse(index.is_empty())
+        index.add(self.public / "a.html", "A2", {"apple": 1, "date": 4})
+        self.write(index)
+        self.assertEqual({"apple": {0: 1}}, self.shard("ap"))
+        self.assertIsNone(self.shard("ba"))
+        self.assertEqual({"date": {0: 4}}, self.shard("da"))
+        # shards without terms of the changed page are left alone
+        self.assertEqual('{"cherry":[1,5]}', cherry.read_text())
+
+    def test_removed_page(self):
+        index = self.index()
+        index.add(self.public / "a.html", "A", {"apple": 1})
+        index.add(self.public / "b.html", "B", {"apple": 3})
+        self.write(index)
+
+        index = self.index()
+        index.remove("/a.html")
+        index.add(self.public / "c.html", "C", {"cherry": 2})
+        self.write(index)
+        # the id of the removed page is reused
+        self.assertEqual({"apple": {1: 3}}, self.shard("ap"))
+        self.assertEqual({"cherry": {0: 2}}, self.shard("ch"))
+        self.assertEqual(
+            [["/c.html", "C"], ["/b.html", "B"]],
+            json.loads((self.public / "search" / "docs.json").read_text()),
+        )
+
+        index = self.index()
+        index.remove("/b.html")
+        self.write(index)
+        self.assertEqual(
+            [["/c.html", "C"]],
+            json.loads((self.public / "search" / "docs.json").read_text()),
+        )
+        self.assertEqual(1, self.index().next_id)
+
+    def test_unknown_shards_replaced(self):
+        index = self.index()
+        index.add(self.public / "a.html", "A", {"apple": 1})
+        self.write(index)
+        self.state.unlink()
+
+        index = self.index()
+        self.assertTrue(index.is_empty())
+        index.add(self.public / "b.html", "B", {"banana": 1})
+        self.write(index)
+        self.assertIsNone(self.shard("ap"))
+        self.assertEqual({"banana": {0: 1}}, self.shard("ba"))
+
+    def test_removed_before_write(self):
+        index = self.index()
+        index.add(self.public / "a.html", "A", {"apple": 1})
+        index.remove("/a.html")
+        index.add(self.public / "b.html", "B", {"banana": 1})
+        self.write(index)
+        self.assertIsNone(self.shard("ap"))
+        self.assertEqual({"banana": {0: 1}}, self.shard("ba"))
+
+
+class TestGeneratePages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.public = self.dir / "public"
+        self.tmplt = self.dir / "template.html"
+        self.tmplt.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.content.mkdir()
+        (self.content / "index.md").write_text("# Home\n\nWelcome home")
+        (self.content / "post.md").write_text("# Post\n\nA **welcome** post")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+        self.index = SearchIndex(
+            self.public, self.public / "search", self.dir / "search.json"
+        )
+        search.enable_search(self.index)
+
+    def tearDown(self):
+        search.disable_search()
+        self.tmp.cleanup()
+
+    def build(self, jobs=1, force=False):
+        with redirect_stdout(io.StringIO()) as log:
+            generate_pages_recursive(
+                self.content,
+                self.public,
+                self.manifest,
+                tmplt=self.tmplt,
+                jobs=jobs,
+                force=force,
+            )
+            self.index.sync(self.manifest)
+            self.index.write()
+        return log.getvalue()
+
+    def test_pages_indexed(self):
+        for jobs in [1, 2]:
+            with self.subTest(jobs=jobs):
+                self.build(jobs)
+                docs = json.loads((self.public / "search" / "docs.json").read_text())
+                self.assertEqual({"/index.html", "/post.html"}, {d[0] for d in docs})
+                ids = {url: doc for doc, (url, _) in enumerate(docs)}
+                terms = json.loads(
+                    (self.public / "search" / "terms" / "we.json").read_text()
+                )
+                self.assertEqual(
+                    {ids["/index.html"]: 1, ids["/post.html"]: 1},
+                    decode_postings(terms["welcome"]),
+                )
+
+    def test_removed_source(self):
+        self.build()
+        (self.content / "post.md").unlink()
+        with redirect_stdout(io.StringIO()):
+            remove_stale_pages(self.manifest)
+        self.build()
+        docs = json.loads((self.public / "search" / "docs.json").read_text())
+        self.assertEqual(["/index.html"], [d[0] for d in docs if d])
+
+    def test_lost_index_rebuilt(self):
+        self.build()
+        # e.g. the state was deleted, the pages are still fresh
+        self.index = SearchIndex(self.public, self.public / "search", self.dir / "x")
+        search.enable_search(self.index)
+        self.assertTrue(self.index.is_empty())
+        self.assertNotIn("(unchanged)", self.build(force=True))
+        self.assertEqual(2, len(self.index.pages))
+        # outputs are still known, so removed sources are cleaned up
+        (self.content / "post.md").unlink()
+        with redirect_stdout(io.StringIO()):
+            remove_stale_pages(self.manifest)
+        self.assertFalse((self.public / "post.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
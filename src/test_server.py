@@ -0,0 +1,224 @@
+import gzip
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from functools import partial
+from pathlib import Path
+
+# server.py is in the project root, next to src/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from server import (
+    OnDemandHandler,
+    StaticHandler,
+    ThreadingHTTPServer,
+    accepted_encodings,
+    etag_matches,
+)
+
+
+def serve(handler_class, directory):
+    """Starts a server on a free port, returns it and a connection to it."""
+    quiet_handler = type(
+        "QuietHandler", (handler_class,), {"log_message": lambda *args: None}
+    )
+    httpd = ThreadingHTTPServer(
+        ("localhost", 0), partial(quiet_handler, directory=str(directory))
+    )
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    return httpd, http.client.HTTPConnection("localhost", httpd.server_port)
+
+
+def request(conn, method, path, headers=None):
+    conn.request(method, path, headers=headers or {})
+    response = conn.getresponse()
+    return response, response.read()
+
+
+class TestHeaders(unittest.TestCase):
+
+    def test_accepted_encodings(self):
+        self.assertEqual(set(), accepted_encodings(None))
+        self.assertEqual(
+            {"gzip", "deflate"},
+            accepted_encodings("GZIP, br;q=0, deflate;q=0.5, zstd;q=x"),
+        )
+
+    def test_etag_matches(self):
+        self.assertFalse(etag_matches(None, '"a"'))
+        self.assertTrue(etag_matches(" * ", '"a"'))
+        self.assertTrue(etag_matches('"b", W/"a"', '"a"'))
+        self.assertFalse(etag_matches('"b"', '"a"'))
+
+
+class TestPickEncoding(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.page = os.path.join(self.tmp.name, "index.html")
+        for path in (self.page, self.page + ".gz", self.page + ".br"):
+            Path(path).write_text(path)
+            os.utime(path, ns=(0, 10**9))
+        self.handler = StaticHandler.__new__(StaticHandler)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pick(self, accept_encoding):
+        self.handler.headers = {"Accept-Encoding": accept_encoding}
+        return self.handler.pick_encoding(self.page)
+
+    def test_preferred(self):
+        self.assertEqual("br", self.pick("gzip, br"))
+        self.assertEqual("gzip", self.pick("gzip"))
+        self.assertEqual("br", self.pick("*"))
+        self.assertIsNone(self.pick("identity"))
+
+    def test_stale_variant(self):
+        # left over from a previous build of the page
+        os.utime(self.page + ".br", ns=(0, 10**9 - 1))
+        self.assertEqual("gzip", self.pick("gzip, br"))
+
+
+class TestStaticHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "index.html").write_text("<p>Hello</p>" * 100)
+        (self.dir / "index.html.gz").write_bytes(
+            gzip.compress((self.dir / "index.html").read_bytes())
+        )
+        (self.dir / "index.3f2a1b9c.css").write_text("body {}")
+        (self.dir / "logo.png").write_bytes(b"png")
+        self.httpd, self.conn = serve(StaticHandler, self.dir)
+
+    def tearDown(self):
+        self.conn.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.tmp.cleanup()
+
+    def test_precompressed(self):
+        response, body = request(self.conn, "GET", "/", {"Accept-Encoding": "gzip"})
+        self.assertEqual(200, response.status)
+        self.assertEqual("gzip", response.getheader("Content-Encoding"))
+        self.assertEqual("Accept-Encoding", response.getheader("Vary"))
+        self.assertEqual(
+            (self.dir / "index.html").read_bytes(), gzip.decompress(body)
+        )
+
+    def test_not_modified(self):
+        response, body = request(self.conn, "GET", "/index.html")
+        etag = response.getheader("ETag")
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        response, body = request(
+            self.conn, "GET", "/index.html", {"If-None-Match": etag}
+        )
+        self.assertEqual(304, response.status)
+        self.assertEqual(b"", body)
+        self.assertEqual(etag, response.getheader("ETag"))
+        self.assertEqual("no-cache", response.getheader("Cache-Control"))
+
+    def test_cache_control(self):
+        expected = {
+            "/index.html": "no-cache",
+            "/index.3f2a1b9c.css": "public, max-age=31536000, immutable",
+            "/logo.png": "public, max-age=3600",
+        }
+        for path, cache_control in expected.items():
+            with self.subTest(path=path):
+                response, _ = request(self.conn, "HEAD", path)
+                self.assertEqual(cache_control, response.getheader("Cache-Control"))
+
+
+class TestOnDemandHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.static = self.dir / "static"
+        self.template = self.dir / "template" / "template.html"
+        for directory in (self.content / "majesty", self.static, self.template.parent):
+            directory.mkdir(parents=True)
+        self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        (self.template.parent / "post.html").write_text("<main>{{ Content }}</main>")
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "majesty" / "index.md").write_text("# Majesty")
+        (self.content / "post.md").write_text("---\ntemplate: post.html\n---\n# Post")
+        (self.content / "draft.md").write_text("---\ndraft: true\n---\n# Draft")
+        (self.static / "index.css").write_text("body {}")
+        self.handler_class = type(
+            "Handler",
+            (OnDemandHandler,),
+            {"content": str(self.content), "template": str(self.template), "cache": {}},
+        )
+        self.httpd, self.conn = serve(self.handler_class, self.static)
+
+    def tearDown(self):
+        self.conn.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.tmp.cleanup()
+
+    def source_path(self, path):
+        handler = self.handler_class.__new__(self.handler_class)
+        handler.path = path
+        return handler.source_path()
+
+    def test_source_path(self):
+        self.assertEqual(str(self.content / "index.md"), self.source_path("/"))
+        self.assertEqual(
+            str(self.content / "majesty" / "index.md"), self.source_path("/majesty/")
+        )
+        self.assertEqual(
+            str(self.content / "post.md"), self.source_path("/../post.html?a=1")
+        )
+        self.assertIsNone(self.source_path("/majesty"))
+        self.assertIsNone(self.source_path("/index.css"))
+
+    def test_render(self):
+        response, body = request(self.conn, "GET", "/")
+        self.assertEqual(200, response.status)
+        self.assertIn(b"<title>Home</title>", body)
+        # template named in the front matter
+        _, body = request(self.conn, "GET", "/post.html")
+        self.assertTrue(body.startswith(b"<main>"))
+
+    def test_template_changed(self):
+        request(self.conn, "GET", "/post.html")
+        post_template = self.template.parent / "post.html"
+        post_template.write_text("<article>{{ Content }}</article>")
+        os.utime(post_template, ns=(0, 10**9))
+        _, body = request(self.conn, "GET", "/post.html")
+        self.assertTrue(body.startswith(b"<article>"))
+
+    def test_draft(self):
+        response, _ = request(self.conn, "GET", "/draft.html")
+        self.assertEqual(404, response.status)
+
+    def test_redirect(self):
+        response, _ = request(self.conn, "GET", "/majesty?a=1")
+        self.assertEqual(301, response.status)
+        self.assertEqual("/majesty/?a=1", response.getheader("Location"))
+
+    def test_head(self):
+        response, body = request(self.conn, "HEAD", "/majesty/")
+        self.assertEqual(200, response.status)
+        self.assertEqual(b"", body)
+        self.assertGreater(int(response.getheader("Content-Length")), 0)
+
+    def test_static(self):
+        response, body = request(self.conn, "GET", "/index.css")
+        self.assertEqual(200, response.status)
+        self.assertEqual(b"body {}", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
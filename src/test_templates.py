@@ -0,0 +1,96 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from htmlnode import LeafNode
+from templates import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+
+    def render(self, template, **values):
+        stream = io.StringIO()
+        template.render(stream, **values)
+        return stream.getvalue()
+
+    def test_slots(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}")
+        self.assertEqual({"Title", "Content"}, template.slots)
+
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title><main>{{ Content }}</main>")
+        self.assertEqual(
+            "<title> Home </title><main><p>Hi</p></main>",
+            self.render(template, Title="Home", Content=LeafNode("p", "Hi")),
+        )
+
+    def test_missing_value_kept(self):
+        template = Template("<nav>{{ Nav }}</nav>")
+        self.assertEqual("<nav>{{ Nav }}</nav>", self.render(template))
+
+    def test_load_template_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "template.html"
+            path.write_text("{{ Content }}")
+            self.assertIs(load_template(path), load_template(path))
+
+
+class TestLayoutsAndPartials(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "partials").mkdir()
+        (self.dir / "base.html").write_text(
+            "<title>{{ Title }}</title>{{> partials/nav.html }}{{ Content }}"
+        )
+        (self.dir / "partials" / "nav.html").write_text("<nav>Home</nav>")
+        (self.dir / "post.html").write_text(
+            "{{< base.html }}\n<article>{{ Content }}</article>"
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, template, **values):
+        stream = io.StringIO()
+        template.render(stream, **values)
+        return stream.getvalue()
+
+    def test_layout(self):
+        template = load_template(self.dir / "post.html")
+        self.assertEqual(
+            "<title>Post</title><nav>Home</nav><article>Hi</article>",
+            self.render(template, Title="Post", Content="Hi"),
+        )
+        self.assertEqual(
+            [
+                self.dir / "post.html",
+                self.dir / "base.html",
+                self.dir / "partials" / "nav.html",
+            ],
+            template.files,
+        )
+
+    def test_changed_partial_recompiles(self):
+        template = load_template(self.dir / "post.html")
+        nav = self.dir / "partials" / "nav.html"
+        nav.write_text("<nav>Start</nav>")
+        os.utime(nav, ns=(0, 0))
+        self.assertIsNot(template, load_template(self.dir / "post.html"))
+        self.assertIn("Start", self.render(load_template(self.dir / "post.html")))
+
+    def test_errors(self):
+        (self.dir / "partials" / "nav.html").write_text("{{> nav.html }}")
+        with self.assertRaisesRegex(ValueError, "includes itself"):
+            load_template(self.dir / "base.html")
+        (self.dir / "partials" / "nav.html").write_text("<nav>Home</nav>")
+        (self.dir / "base.html").write_text("<title>{{ Title }}</title>")
+        with self.assertRaisesRegex(ValueError, "no {{ Content }} slot"):
+            load_template(self.dir / "post.html")
+
+
+if __name__ == "__main__":
+    unittest.main()
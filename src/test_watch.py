@@ -0,0 +1,92 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from manifest import BuildManifest
+from watch import Watcher, rebuild
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + struct.pack(">II", 640, 480)
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "index.md").write_text("# Home")
+        self.watcher = Watcher([self.dir])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_no_changes(self):
+        self.assertEqual([], self.watcher.poll())
+
+    def test_changes(self):
+        (self.dir / "index.md").write_text("# Home page")
+        os.utime(self.dir / "index.md", ns=(0, 0))
+        (self.dir / "new.md").write_text("# New")
+        self.assertEqual(
+            [self.dir / "index.md", self.dir / "new.md"], self.watcher.poll()
+        )
+        self.assertEqual([], self.watcher.poll())
+
+    def test_removed(self):
+        (self.dir / "index.md").unlink()
+        self.assertEqual([self.dir / "index.md"], self.watcher.poll())
+
+
+class TestRebuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.content = self.dir / "content"
+        self.static = self.dir / "static"
+        self.public = self.dir / "public"
+        self.tmplt = self.dir / "template" / "template.html"
+        for directory in (self.content, self.static, self.tmplt.parent):
+            directory.mkdir()
+        self.tmplt.write_text("{{ Content }}")
+        (self.content / "index.md").write_text("# Home\n\n![logo](/logo.png)")
+        (self.content / "post.md").write_text("# Post")
+        self.manifest = BuildManifest(self.dir / "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rebuild(self, *changes):
+        with redirect_stdout(io.StringIO()) as log:
+            rebuild(
+                list(changes),
+                self.manifest,
+                self.content,
+                self.static,
+                self.tmplt.parent,
+                self.public,
+                self.tmplt,
+                self.dir / "images.json",
+            )
+        return log.getvalue()
+
+    def test_image_attributes(self):
+        (self.static / "logo.png").write_bytes(PNG)
+        self.rebuild(self.static / "logo.png", self.tmplt)
+        index = self.public / "index.html"
+        self.assertIn('width="640" height="480"', index.read_text())
+        # recorded like in a full build, so main() does not build it again
+        entry = self.manifest.outputs[str(index)]
+        self.assertEqual({"images": True}, entry["options"])
+
+        (self.static / "logo.png").write_bytes(PNG[:-8] + struct.pack(">II", 32, 16))
+        log = self.rebuild(self.static / "logo.png")
+        self.assertIn('width="32" height="16"', index.read_text())
+        self.assertIn(f"{self.public / 'post.html'} (unchanged)", log)
+
+
+if __name__ == "__main__":
+    unittest.main()
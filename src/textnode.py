@@ -8,11 +8,15 @@ class TextType(Enum):
     CODE = 4
     LINK = 5
     IMAGE = 6
+    BOLD_ITALIC = 7
 
 
 class TextNode:
     """"""
 
+    # no per-instance __dict__, every inline span is a TextNode
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(
         self, text: str, text_type: TextType = TextType.TEXT, url: str = None
     ) -> None:
@@ -0,0 +1,121 @@
+import os
+import time
+from pathlib import Path
+
+from images import disable_images, enable_images, image_sizes
+from main import copy_file, remove_stale_files
+from manifest import BuildManifest
+from markdown_to_html import generate_page, generate_pages_recursive, remove_stale_pages
+
+
+class Watcher:
+    """Polls directories for added, changed and removed files."""
+
+    def __init__(self, dirs: tuple) -> None:
+        self.dirs = dirs
+        self.snapshot = self.scan()
+
+    def scan(self) -> dict:
+        """Returns {path: (mtime_ns, size)} of all files in the watched dirs."""
+        files = {}
+        for directory in self.dirs:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files[Path(path)] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def poll(self) -> list:
+        """Returns the files that were added, changed or removed since the last poll."""
+        snapshot = self.scan()
+        changes = [
+            path
+            for path in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(path) != self.snapshot.get(path)
+        ]
+        self.snapshot = snapshot
+        return sorted(changes)
+
+
+def rebuild(
+    changes: list,
+    manifest: BuildManifest,
+    content: Path = Path("content/"),
+    static: Path = Path("static/"),
+    templates: Path = Path("template/"),
+    dst: Path = Path("public/"),
+    tmplt: Path = Path("template/template.html"),
+    sizes: Path = Path(".build/images.json"),
+):
+    """Rebuilds only the pages and static files affected by changes.
+
+    A changed template rebuilds all pages and a changed page only itself.
+    A changed static file is copied again and the pages showing it are
+    rebuilt, see page_depends. Outputs of removed files are deleted.
+    Pages get image attributes from sizes, like in a full build.
+    """
+    for src_file in changes:
+        if src_file.is_relative_to(static) and src_file.is_file():
+            dst_file = dst / src_file.relative_to(static)
+            dst_file.parent.mkdir(parents=True, exist_ok=True)
+            copy_file(src_file, dst_file)
+            manifest.record(dst_file, [src_file], kind="asset")
+            print(f"✅ {dst_file} (from '{src_file}')")
+    remove_stale_files(manifest)
+
+    enable_images(image_sizes(manifest, dst, sizes))
+    try:
+        if any(
+            path.is_relative_to(templates) or path.is_relative_to(static)
+            for path in changes
+        ):
+            generate_pages_recursive(content, dst, manifest, tmplt=tmplt)
+        else:
+            for src_file in changes:
+                if not src_file.is_relative_to(content) or src_file.suffix != ".md":
+                    continue
+                if not src_file.is_file():
+                    continue
+                dst_file = dst / src_file.relative_to(content).with_suffix(".html")
+                try:
+                    generate_page(src_file, tmplt, dst_file, manifest)
+                except Exception as e:
+                    # keep watching, the page is rebuilt on its next change
+                    print(f"❌ {src_file}: {type(e).__name__}: {e}")
+    finally:
+        disable_images()
+
+    remove_stale_pages(manifest)
+    manifest.save()
+
+
+def watch(
+    on_rebuild=None,
+    manifest: BuildManifest = None,
+    dirs: tuple = (Path("content/"), Path("static/"), Path("template/")),
+    interval: float = 0.2,
+):
+    """Polls dirs forever and rebuilds whatever changed.
+
+    on_rebuild is called after every rebuild, e.g. to reload browsers.
+    """
+    if manifest is None:
+        manifest = BuildManifest()
+    watcher = Watcher(dirs)
+
+    while True:
+        time.sleep(interval)
+        changes = watcher.poll()
+        if not changes:
+            continue
+
+        start = time.perf_counter()
+        print(f"\n🔄 {len(changes)} file(s) changed")
+        rebuild(changes, manifest)
+        print(f"🔄 Rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms")
+        if on_rebuild is not None:
+            on_rebuild()